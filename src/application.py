@@ -17,7 +17,15 @@ from tkinter import (
     filedialog,
     messagebox,
 )
-from tkinter.ttk import Checkbutton, Combobox, Progressbar, Radiobutton, Scrollbar, Separator
+from tkinter.ttk import (
+    Checkbutton,
+    Combobox,
+    Progressbar,
+    Radiobutton,
+    Scrollbar,
+    Separator,
+    Spinbox,
+)
 
 # own imports
 from database import Database
@@ -107,7 +115,8 @@ class MainApp:
         f_count_max = self.meta_info.file_count_max
 
         self.file_progress["value"] = f_count
-        self.file_progress["maximum"] = f_count_max
+        # The maximum is zero until the first files are scanned
+        self.file_progress["maximum"] = max(f_count_max, 1)
         self.file_progress.update()
 
         if not self.meta_info.text_queue.empty():
@@ -306,9 +315,45 @@ class MainApp:
         rbtn_move = Radiobutton(
             window, text="Move files", variable=self.meta_info.copy_files, value=0
         )
-        rbtn_move.grid(row=self.row(), column=1, padx=PAD_X, pady=PAD_Y, sticky="W")
+        rbtn_move.grid(row=self.row_idx, column=1, padx=PAD_X, pady=PAD_Y, sticky="W")
         Hovertip(rbtn_move, TooltipDict["rbtn_movefile"])
 
+        cb_cache = Checkbutton(window, text="Cache metadata", variable=self.meta_info.use_cache)
+        cb_cache.grid(row=self.row(), column=2, padx=PAD_X, pady=PAD_Y, sticky="W")
+        Hovertip(cb_cache, TooltipDict["cb_cache"])
+
+        lbl = Label(window, text="Copy mode:")
+        lbl.grid(row=self.row_idx, column=0, padx=PAD_X, pady=PAD_Y, sticky="W")
+        cb_link_select = Combobox(window, textvariable=self.meta_info.link_mode)
+        cb_link_select["values"] = self.meta_info.get_link_modes()
+        # Prevent typing a value
+        cb_link_select["state"] = "readonly"
+        cb_link_select.grid(row=self.row(), column=1, padx=PAD_X, pady=PAD_Y, sticky="W")
+        Hovertip(cb_link_select, TooltipDict["cb_link_select"])
+
+        lbl = Label(window, text="Worker threads:")
+        lbl.grid(row=self.row_idx, column=0, padx=PAD_X, pady=PAD_Y, sticky="W")
+        sb_workers = Spinbox(
+            window,
+            from_=1,
+            to=max(os.cpu_count() or 1, 1) * 2,
+            textvariable=self.meta_info.worker_count,
+            state="readonly",
+            width=5,
+        )
+        sb_workers.grid(row=self.row_idx, column=1, padx=PAD_X, pady=PAD_Y, sticky="W")
+        Hovertip(sb_workers, TooltipDict["sb_workers"])
+
+        cb_defer = Checkbutton(
+            window, text="Defer conflicts", variable=self.meta_info.defer_conflicts
+        )
+        cb_defer.grid(row=self.row(), column=2, padx=PAD_X, pady=PAD_Y, sticky="W")
+        Hovertip(cb_defer, TooltipDict["cb_defer"])
+
+        cb_dry_run = Checkbutton(window, text="Dry run", variable=self.meta_info.dry_run)
+        cb_dry_run.grid(row=self.row(), column=0, padx=PAD_X, pady=PAD_Y, sticky="W")
+        Hovertip(cb_dry_run, TooltipDict["cb_dry_run"])
+
     def init_progressindicator(self, window: Tk):
         """Add GUI progressbar and corresponding label."""
         # Update to get the correct width for the progressbar
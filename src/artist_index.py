@@ -0,0 +1,90 @@
+import datetime
+from typing import Any, Sequence
+
+from database import (
+    ARTIST_E_DATE,
+    ARTIST_MAKE,
+    ARTIST_MODEL,
+    ARTIST_P_ID,
+    ARTIST_S_DATE,
+    ARTIST_TSHIFT,
+    EVENT_ID,
+    PART_E_DATE,
+    PART_E_ID,
+    PART_P_ID,
+    PART_S_DATE,
+    PERSON_ID,
+    PERSON_NAME,
+)
+from helper import parse_time_shift, test_time_frame_outside
+from interval_index import IntervalIndex
+
+
+class ArtistIndex:
+    """
+    In-memory resolution table from the camera (make and model) of an image to the
+    artists that used it and the events they participated in. The artists, participants
+    and persons are joined once, such that resolving a file does not need any query.
+    """
+
+    def __init__(
+        self,
+        artists: Sequence[Sequence[Any]],
+        participants: Sequence[Sequence[Any]],
+        persons: Sequence[Sequence[Any]],
+    ):
+        """Join the given database rows, all rows are expected to be ordered by their id."""
+        names = {p[PERSON_ID]: p[PERSON_NAME] for p in persons}
+
+        # Participation time frames of each person grouped by event
+        # Order: p_start, p_end
+        parts: dict[int, dict[int, list[tuple[datetime.datetime, datetime.datetime]]]] = {}
+        for p in participants:
+            by_event = parts.setdefault(p[PART_P_ID], {})
+            by_event.setdefault(p[PART_E_ID], []).append((p[PART_S_DATE], p[PART_E_DATE]))
+
+        # Order: a_start, a_end, time_shift, name, participations
+        self.cameras: dict[tuple[str, str], list[tuple]] = {}
+        for a in artists:
+            # The time shift is parsed once, such that matching a file needs no string work
+            entry = (
+                a[ARTIST_S_DATE],
+                a[ARTIST_E_DATE],
+                parse_time_shift(a[ARTIST_TSHIFT]),
+                names[a[ARTIST_P_ID]],
+                parts.get(a[ARTIST_P_ID], {}),
+            )
+            self.cameras.setdefault((a[ARTIST_MAKE], a[ARTIST_MODEL]), []).append(entry)
+
+    def has_artist(self, make: str, model: str) -> bool:
+        """Returns true if at least one artist used the given camera."""
+        return (make, model) in self.cameras
+
+    def match(
+        self, date: datetime.datetime, make: str, model: str, event_index: IntervalIndex
+    ) -> list[tuple[Sequence[Any], str, datetime.datetime]]:
+        """
+        Returns all combinations of event and artist that match the given image date
+        and camera. For each artist the date is shifted by the time shift of the artist,
+        the shifted date must lie inside the time frame of the artist and inside the
+        participation time frame of the artist at the event.
+        Order: event, name, shifted_date
+        """
+        result = []
+        for a_start, a_end, date_shift, name, participations in self.cameras.get(
+            (make, model), []
+        ):
+            # Shift the image date
+            shifted_date = date + date_shift
+            # Check if this artist matches the time frame itselft
+            if test_time_frame_outside(a_start, a_end, shifted_date, shifted_date):
+                continue
+
+            for event in event_index.get_by_date(shifted_date):
+                for p_start, p_end in participations.get(event[EVENT_ID], []):
+                    # Check that the participation timeframe matches the image date
+                    if test_time_frame_outside(p_start, p_end, shifted_date, shifted_date):
+                        continue
+                    result.append((event, name, shifted_date))
+
+        return result
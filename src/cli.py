@@ -0,0 +1,176 @@
+import argparse
+import os
+import queue
+import threading
+from typing import Union
+
+from meta_information import MetaInformation
+from sorter import Sorter
+
+
+def parse_args(meta_info: MetaInformation, args: Union[list[str], None] = None):
+    """Parse the command line arguments, the defaults are the same as in the GUI."""
+    parser = argparse.ArgumentParser(
+        description="Sort images into folders without GUI, using the database of the "
+        + "current working directory (database.db)."
+    )
+    parser.add_argument(
+        "source", nargs="?", help="Directory with the files that should be sorted."
+    )
+    parser.add_argument("target", nargs="?", help="Directory the sorted files are saved to.")
+
+    parser.add_argument(
+        "--in-signature",
+        choices=meta_info.get_read_choices(),
+        default=meta_info.in_signature.get(),
+        help="Information that is used to get the date of a file.",
+    )
+    parser.add_argument(
+        "--file-signature",
+        choices=meta_info.get_supported_file_signatures(),
+        default=meta_info.file_signature.get(),
+        help="Signature of the new file names.",
+    )
+    parser.add_argument(
+        "--folder-signature",
+        choices=meta_info.get_supported_folder_signatures(),
+        default=meta_info.folder_signature.get(),
+        help="Signature of the new folder names.",
+    )
+
+    parser.add_argument("--move", action="store_true", help="Move instead of copy the files.")
+    parser.add_argument(
+        "--link",
+        choices=meta_info.get_link_modes(),
+        default=meta_info.link_mode.get(),
+        help="Copy files as links, if source and target are on the same device.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=meta_info.copy_chunk_size // (1024 * 1024),
+        help="Size in MiB of the chunks used for copying files.",
+    )
+    parser.add_argument(
+        "--no-recursive", action="store_true", help="Only process the source directory itself."
+    )
+    parser.add_argument(
+        "--no-unmatched", action="store_true", help="Ignore files without matching event."
+    )
+    parser.add_argument(
+        "--no-samename", action="store_true", help="Do not process same name files together."
+    )
+    parser.add_argument(
+        "--no-require-artist", action="store_true", help="Do not require an artist."
+    )
+    parser.add_argument(
+        "--no-modify-meta", action="store_true", help="Do not modify the metadata of .jpg files."
+    )
+    parser.add_argument(
+        "--no-overwrite-meta", action="store_true", help="Only add missing metadata."
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Do not use the metadata cache.")
+    parser.add_argument(
+        "--cache-file",
+        default=meta_info.cache_file.get(),
+        help="File the metadata cache is saved to.",
+    )
+    parser.add_argument(
+        "--defer-conflicts",
+        action="store_true",
+        help="Process files that need a decision at the end of the run.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=meta_info.worker_count.get(),
+        help="Number of threads used for analysing the files.",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=meta_info.io_worker_count,
+        help="Number of threads used for moving or copying the files.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Do not move or copy any file, only save the planned operations.",
+    )
+    parser.add_argument(
+        "--plan",
+        default=meta_info.plan_file.get(),
+        help="File the planned operations of a dry run are saved to.",
+    )
+    parser.add_argument(
+        "--journal",
+        default=meta_info.journal_file.get(),
+        help="File the journal of the run is saved to, used to resume interrupted runs.",
+    )
+    parser.add_argument(
+        "--execute-plan",
+        metavar="PLAN",
+        help="Execute the operations of a dry run instead of sorting, "
+        + "source and target are not needed.",
+    )
+    parsed = parser.parse_args(args)
+    if parsed.execute_plan is None and (parsed.source is None or parsed.target is None):
+        parser.error("source and target are required, unless a plan is executed")
+    return parsed
+
+
+def main(args: Union[list[str], None] = None):
+    """
+    Run the sorting process without GUI. Since there is no user to ask,
+    the decisions are made automatically (see HeadlessInteraction) and reported.
+    """
+    meta_info = MetaInformation(headless=True)
+    parsed = parse_args(meta_info, args)
+
+    if parsed.execute_plan is None:
+        meta_info.set_dirs(os.path.abspath(parsed.source), os.path.abspath(parsed.target), "", "")
+    meta_info.in_signature.set(parsed.in_signature)
+    meta_info.file_signature.set(parsed.file_signature)
+    meta_info.folder_signature.set(parsed.folder_signature)
+
+    meta_info.copy_files.set(0 if parsed.move else 1)
+    meta_info.link_mode.set(parsed.link)
+    meta_info.copy_chunk_size = max(parsed.chunk_size, 1) * 1024 * 1024
+    meta_info.recursive.set(0 if parsed.no_recursive else 1)
+    meta_info.process_unmatched.set(0 if parsed.no_unmatched else 1)
+    # Same as in the GUI, same name files can not be processed with Foldername_Number
+    samename = not parsed.no_samename and parsed.file_signature != "Foldername_Number"
+    meta_info.process_samename.set(1 if samename else 0)
+    meta_info.require_artist.set(0 if parsed.no_require_artist else 1)
+    meta_info.modify_meta.set(0 if parsed.no_modify_meta else 1)
+    meta_info.overwrite_meta.set(0 if parsed.no_overwrite_meta else 1)
+    meta_info.use_cache.set(0 if parsed.no_cache else 1)
+    meta_info.cache_file.set(parsed.cache_file)
+    meta_info.defer_conflicts.set(1 if parsed.defer_conflicts else 0)
+    meta_info.worker_count.set(max(parsed.workers, 1))
+    meta_info.io_worker_count = max(parsed.io_workers, 1)
+    meta_info.dry_run.set(1 if parsed.dry_run else 0)
+    meta_info.plan_file.set(parsed.plan)
+    meta_info.journal_file.set(parsed.journal)
+
+    # The sorter runs in its own thread, such that the messages are printed while sorting
+    meta_info.finished = False
+    sorter = Sorter(meta_info)
+    if parsed.execute_plan is not None:
+        thread = threading.Thread(target=sorter.run_plan, args=(parsed.execute_plan,))
+    else:
+        thread = threading.Thread(target=sorter.run)
+    thread.start()
+    while thread.is_alive() or not meta_info.text_queue.empty():
+        try:
+            print(meta_info.text_queue.get(timeout=0.1), end="", flush=True)
+        except queue.Empty:
+            pass
+    thread.join()
+
+
+###################################################################################################
+# Main
+###################################################################################################
+if __name__ == "__main__":
+    main()
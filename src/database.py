@@ -2,11 +2,12 @@ import json
 import sqlite3
 from collections.abc import Iterable
 from datetime import datetime
+from functools import partial
 from typing import Any, Literal, Union
 
 import xlsxwriter
 from debug_messages import InfoCodes
-from helper import test_time_frame, test_time_frame_outside, wbox
+from helper import parse_time_shift, test_time_frame, test_time_frame_outside, wbox
 from openpyxl import load_workbook
 
 PERSON_ID = 0
@@ -33,6 +34,9 @@ PART_E_ID = 2
 PART_S_DATE = 3
 PART_E_DATE = 4
 
+# Version of the database schema, stored as user_version in the database file
+SCHEMA_VERSION = 1
+
 COLUMN_NAMES = {
     "person": [
         "pid",
@@ -86,6 +90,7 @@ class Database:
         )
         self.conn.execute("PRAGMA foreign_keys = 1")
         self.create_tables()
+        self.migrate()
         self.conn.commit()
 
     def close(self):
@@ -131,99 +136,103 @@ class Database:
                 REFERENCES persons (pid) ON DELETE CASCADE ON UPDATE CASCADE)"
         )
 
+    def create_indexes(self):
+        """Creates indexes for the date range and make/model queries."""
+        for table in ("events", "subevents", "artists", "participants"):
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_dates ON {table}(start_date, end_date)"
+            )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_artists_camera ON artists(make, model)")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_participants_event ON participants(event_id, person_id)"
+        )
+
+    def migrate(self):
+        """
+        Upgrades the schema of an existing database file to the current version.
+        Each migration step brings the schema from version i to version i + 1.
+        """
+        migrations = [self.create_indexes]
+        assert len(migrations) == SCHEMA_VERSION
+
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for step in migrations[version:]:
+            step()
+        if version < SCHEMA_VERSION:
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
     def load_from_json(self, file: str):
         """
         Read the table data from a json file.
         If the data was not parseable the GUI will show an info message.
         """
-        err = False
-
         with open(file) as json_file:
             data = json.load(json_file)
-            for person in data["persons"]:
-                err |= (
-                    self.insert_person_with_id(person["pid"], person["name"])
-                    == InfoCodes.ADD_ERROR
-                )
 
-            for artist in data["artists"]:
-                err |= (
-                    self.insert_artist_with_id(
-                        artist["aid"],
-                        artist["person_id"],
-                        artist["make"],
-                        artist["model"],
-                        datetime.fromisoformat(artist["start"]["date"]),
-                        datetime.fromisoformat(artist["end"]["date"]),
-                        artist["timeshift"]["date"],
-                    )
-                    == InfoCodes.ADD_ERROR
+        # The rows of each table in column order
+        rows = {
+            "persons": [(person["pid"], person["name"]) for person in data["persons"]],
+            "artists": [
+                (
+                    artist["aid"],
+                    artist["person_id"],
+                    artist["make"],
+                    artist["model"],
+                    datetime.fromisoformat(artist["start"]["date"]),
+                    datetime.fromisoformat(artist["end"]["date"]),
+                    artist["timeshift"]["date"],
                 )
-
-            for event in data["events"]:
-                err |= (
-                    self.insert_event_with_id(
-                        event["eid"],
-                        event["title"],
-                        datetime.fromisoformat(event["start"]["date"]),
-                        datetime.fromisoformat(event["end"]["date"]),
-                    )
-                    == InfoCodes.ADD_ERROR
+                for artist in data["artists"]
+            ],
+            "events": [
+                (
+                    event["eid"],
+                    event["title"],
+                    datetime.fromisoformat(event["start"]["date"]),
+                    datetime.fromisoformat(event["end"]["date"]),
                 )
-
-            for subevent in data["subevents"]:
-                err |= (
-                    self.insert_subevent_with_id(
-                        subevent["seid"],
-                        subevent["event_id"],
-                        subevent["title"],
-                        datetime.fromisoformat(subevent["start"]["date"]),
-                        datetime.fromisoformat(subevent["end"]["date"]),
-                    )
-                    == InfoCodes.ADD_ERROR
+                for event in data["events"]
+            ],
+            "subevents": [
+                (
+                    subevent["seid"],
+                    subevent["event_id"],
+                    subevent["title"],
+                    datetime.fromisoformat(subevent["start"]["date"]),
+                    datetime.fromisoformat(subevent["end"]["date"]),
                 )
-
-            for participant in data["participants"]:
-                err |= (
-                    self.insert_participant_with_id(
-                        participant["paid"],
-                        participant["person_id"],
-                        participant["event_id"],
-                        datetime.fromisoformat(participant["start"]["date"]),
-                        datetime.fromisoformat(participant["end"]["date"]),
-                    )
-                    == InfoCodes.ADD_ERROR
+                for subevent in data["subevents"]
+            ],
+            "participants": [
+                (
+                    participant["paid"],
+                    participant["person_id"],
+                    participant["event_id"],
+                    datetime.fromisoformat(participant["start"]["date"]),
+                    datetime.fromisoformat(participant["end"]["date"]),
                 )
+                for participant in data["participants"]
+            ],
+        }
 
-        if err:
-            return InfoCodes.LOAD_SUCCESS_PARTIAL
-        else:
-            return InfoCodes.LOAD_SUCCESS
+        return self.load_rows(rows)
 
     def load_from_xlsx(self, file: str):
         """
         Read the table data from a json file.
         If the data was not parseable the GUI will show an info message.
         """
-        err = False
-
         # Define variable to load the dataframe
         workbook = load_workbook(file)
 
-        persons_df = workbook["Persons"]
-        for person in persons_df.iter_rows(min_row=2):
-            err |= (
-                self.insert_person_with_id(
-                    person[PERSON_ID].value,
-                    person[PERSON_NAME].value,
-                )
-                == InfoCodes.ADD_ERROR
-            )
-
-        artists_df = workbook["Artists"]
-        for artist in artists_df.iter_rows(min_row=2):
-            err |= (
-                self.insert_artist_with_id(
+        # The rows of each table in column order
+        rows = {
+            "persons": [
+                (person[PERSON_ID].value, person[PERSON_NAME].value)
+                for person in workbook["Persons"].iter_rows(min_row=2)
+            ],
+            "artists": [
+                (
                     artist[ARTIST_ID].value,
                     artist[ARTIST_P_ID].value,
                     artist[ARTIST_MAKE].value,
@@ -232,52 +241,122 @@ class Database:
                     datetime.fromisoformat(artist[ARTIST_E_DATE].value),
                     artist[ARTIST_TSHIFT].value,
                 )
-                == InfoCodes.ADD_ERROR
-            )
-
-        events_df = workbook["Events"]
-        for event in events_df.iter_rows(min_row=2):
-            err |= (
-                self.insert_event_with_id(
+                for artist in workbook["Artists"].iter_rows(min_row=2)
+            ],
+            "events": [
+                (
                     event[EVENT_ID].value,
                     event[EVENT_TITLE].value,
                     datetime.fromisoformat(event[EVENT_S_DATE].value),
                     datetime.fromisoformat(event[EVENT_E_DATE].value),
                 )
-                == InfoCodes.ADD_ERROR
-            )
-
-        sevents_df = workbook["Subevents"]
-        for subevent in sevents_df.iter_rows(min_row=2):
-            err |= (
-                self.insert_subevent_with_id(
+                for event in workbook["Events"].iter_rows(min_row=2)
+            ],
+            "subevents": [
+                (
                     subevent[SEVENT_ID].value,
                     subevent[SEVENT_E_ID].value,
                     subevent[SEVENT_TITLE].value,
                     datetime.fromisoformat(subevent[SEVENT_S_DATE].value),
                     datetime.fromisoformat(subevent[SEVENT_E_DATE].value),
                 )
-                == InfoCodes.ADD_ERROR
-            )
-
-        parts_df = workbook["Participants"]
-        for participant in parts_df.iter_rows(min_row=2):
-            err |= (
-                self.insert_participant_with_id(
+                for subevent in workbook["Subevents"].iter_rows(min_row=2)
+            ],
+            "participants": [
+                (
                     participant[PART_ID].value,
                     participant[PART_P_ID].value,
                     participant[PART_E_ID].value,
                     datetime.fromisoformat(participant[PART_S_DATE].value),
                     datetime.fromisoformat(participant[PART_E_DATE].value),
                 )
-                == InfoCodes.ADD_ERROR
-            )
+                for participant in workbook["Participants"].iter_rows(min_row=2)
+            ],
+        }
+
+        return self.load_rows(rows)
+
+    def load_rows(self, rows: dict[str, list[tuple]]):
+        """
+        Add the rows loaded from a file to the tables. The rows of each table are given
+        in column order, the tables are ordered such that referenced tables come first.
+        If the database is empty, all rows are inserted with one bulk insert.
+        Otherwise each row is merged with the present data by its insert_with_id function.
+        """
+        err = None
+        if all(self.is_empty(table) for table in rows):
+            err = self.bulk_insert(rows)
+
+        if err is None:
+            insert_functions = {
+                "persons": self.insert_person_with_id,
+                "artists": self.insert_artist_with_id,
+                "events": self.insert_event_with_id,
+                "subevents": self.insert_subevent_with_id,
+                "participants": self.insert_participant_with_id,
+            }
+            err = False
+            for table, table_rows in rows.items():
+                for row in table_rows:
+                    err |= insert_functions[table](*row) == InfoCodes.ADD_ERROR
 
         if err:
             return InfoCodes.LOAD_SUCCESS_PARTIAL
         else:
             return InfoCodes.LOAD_SUCCESS
 
+    def bulk_insert(self, rows: dict[str, list[tuple]]) -> Union[bool, None]:
+        """
+        Validate the rows in memory and insert all of them within one transaction.
+        The foreign keys are only checked once at the end of the transaction.
+        Invalid rows are skipped, in this case True is returned.
+        Returns None if nothing was inserted, since the rows contain duplicates which
+        need to be merged or violate the foreign keys.
+        """
+        for table_rows in rows.values():
+            ids = {row[0] for row in table_rows}
+            contents = {row[1:] for row in table_rows}
+            if len(ids) != len(table_rows) or len(contents) != len(table_rows):
+                return None
+
+        # Already validated rows by id, these are used to validate the references
+        refs: dict[str, dict[int, tuple]] = {"persons": {}, "events": {}}
+        validate_functions = {
+            "persons": self.validate_person,
+            "artists": partial(self.validate_artist, refs=refs),
+            "events": self.validate_event,
+            "subevents": partial(self.validate_subevent, refs=refs),
+            "participants": partial(self.validate_participant, refs=refs),
+        }
+
+        err = False
+        valid_rows: dict[str, list[tuple]] = {}
+        for table, table_rows in rows.items():
+            valid_rows[table] = []
+            for row in table_rows:
+                # All validation functions expect the id as last argument
+                if validate_functions[table](*row[1:], row[0]) == InfoCodes.VAL_ERROR:
+                    err = True
+                    continue
+                valid_rows[table].append(row)
+                if table in refs:
+                    refs[table][row[0]] = row
+
+        try:
+            self.conn.execute("PRAGMA defer_foreign_keys = 1")
+            for table, table_rows in valid_rows.items():
+                qmarks = ", ".join("?" * len(COLUMN_NAMES[table[:-1]]))
+                self.conn.executemany(f"INSERT INTO {table} VALUES ({qmarks})", table_rows)
+            if len(self.conn.execute("PRAGMA foreign_key_check").fetchall()) > 0:
+                self.conn.rollback()
+                return None
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            return None
+
+        return err
+
     def save_to_json(self, file: str):
         """Save all table data to a json file."""
         json_data: dict[str, list] = {
@@ -789,6 +868,29 @@ class Database:
         # Return the id if present
         return result[0][0] if len(result) > 0 else False
 
+    def is_empty(self, table: str) -> bool:
+        """Returns true if the given table does not contain any element."""
+        cur = self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        result = cur.fetchone()
+        cur.close()
+        return result is None
+
+    def get_ref(
+        self,
+        table: str,
+        id_name: str,
+        id: int,
+        refs: Union[dict[str, dict[int, tuple]], None] = None,
+    ) -> Union[tuple, None]:
+        """
+        Returns the element of the table with the given id or None if there is none.
+        If given, the element is taken from the in-memory rows instead of the database.
+        """
+        if refs is not None:
+            return refs[table].get(id)
+        result = self.get(table, (id_name, id))
+        return result[0] if len(result) > 0 else None
+
     def insert(self, table: str, *args: tuple[str, Any]):
         """Insert a new entry to the table with the attributes specified by args."""
         # Extract the query components.
@@ -949,6 +1051,8 @@ class Database:
         # call the function to create all tables.
         # (There are no functions for creating each solo table)
         self.create_tables()
+        # Indexes are dropped together with the table
+        self.create_indexes()
 
         return InfoCodes.CLEAN_SUCCESS
 
@@ -974,10 +1078,12 @@ class Database:
         end_date: datetime,
         time_shift: str,
         aid: int = 1,
+        refs: Union[dict[str, dict[int, tuple]], None] = None,
     ):
         """
         Validation function to test and guarantee, that the given parameter are valid and match
         the expected input for an artist.
+        The referenced persons are taken from refs if given (see get_ref).
         """
         if not isinstance(aid, int):
             return wbox(f"Artist: A-ID {aid}, ({make}, {model}) is not an int.")
@@ -987,7 +1093,7 @@ class Database:
             return wbox(f"Artist: P-ID {pid}, ({make}, {model}) is not an int.")
         if pid < 1:
             return wbox(f"Artist: P-ID {pid}, ({make}, {model}) smaller than 1.")
-        if not self.has("persons", ("pid", pid)):
+        if self.get_ref("persons", "pid", pid, refs) is None:
             return wbox(f"Artist: Could not find person with ID {pid}, ({make}, {model}).")
 
         if not isinstance(make, str):
@@ -1004,6 +1110,8 @@ class Database:
             return wbox(f"Artist: Timeshift ({time_shift}) is not string (ID: {aid}).")
         if time_shift == "":
             return wbox(f"Artist: Timeshift is an empty string (ID: {aid}).")
+        if parse_time_shift(time_shift) is None:
+            return wbox(f"Artist: Timeshift ({time_shift}) is not of form d:h:m:s (ID: {aid}).")
 
         if not isinstance(start_date, datetime):
             return wbox(f"Artist: Start date ({start_date}) is not datetime (ID: {aid}).")
@@ -1167,7 +1275,13 @@ class Database:
         """
         if (
             self.validate_artist(
-                person_id, make, model, start_date, end_date, "_", artist_id if artist_id else 1
+                person_id,
+                make,
+                model,
+                start_date,
+                end_date,
+                "0:0:0:0",
+                artist_id if artist_id else 1,
             )
             == InfoCodes.VAL_ERROR
         ):
@@ -1369,11 +1483,18 @@ class Database:
     # Subevent related
     ###############################################################################################
     def validate_subevent(
-        self, event_id: int, title: str, start_date: datetime, end_date: datetime, seid: int = 1
+        self,
+        event_id: int,
+        title: str,
+        start_date: datetime,
+        end_date: datetime,
+        seid: int = 1,
+        refs: Union[dict[str, dict[int, tuple]], None] = None,
     ):
         """
         Validation function to test and guarantee, that the given parameter are valid and match
         the expected input for a subevent.
+        The referenced events are taken from refs if given (see get_ref).
         """
         if not isinstance(seid, int):
             return wbox(f"Subevent ({seid}, {title}): SE-ID is not an int.")
@@ -1383,7 +1504,8 @@ class Database:
             return wbox(f"Subevent ({seid}, {title}): E-ID is not an int.")
         if event_id < 1:
             return wbox(f"Subevent ({seid}, {title}): E-ID smaller than 1.")
-        if not self.has("events", ("eid", event_id)):
+        event = self.get_ref("events", "eid", event_id, refs)
+        if event is None:
             return wbox(f"Subevent ({seid}, {title}): Could not find event with ID.")
 
         if not isinstance(title, str):
@@ -1398,7 +1520,6 @@ class Database:
         if start_date > end_date:
             return wbox(f"Subevent ({seid}, {title}): End date begins before start date.")
 
-        event = self.get("events", ("eid", event_id))[0]
         if test_time_frame_outside(event[2], event[3], start_date, end_date) is not None:
             return wbox(f"Subevent ({seid}, {title}): Timeframe does not match parent event.")
 
@@ -1493,10 +1614,12 @@ class Database:
         start_date: datetime,
         end_date: datetime,
         paid: int = 1,
+        refs: Union[dict[str, dict[int, tuple]], None] = None,
     ):
         """
         Validation function to test and guarantee, that the given parameter are valid and match
         the expected input for a participant.
+        The referenced persons and events are taken from refs if given (see get_ref).
         """
         if not isinstance(paid, int):
             return wbox(f"Participant ({paid}, {person_id}): PA-ID is not an int.")
@@ -1506,13 +1629,14 @@ class Database:
             return wbox(f"Participant ({paid}, {person_id}): P-ID is not an int.")
         if person_id < 1:
             return wbox(f"Participant ({paid}, {person_id}): P-ID smaller than 1.")
-        if not self.has("persons", ("pid", person_id)):
+        if self.get_ref("persons", "pid", person_id, refs) is None:
             return wbox(f"Participant ({paid}, {person_id}): Could not find person with ID.")
         if not isinstance(event_id, int):
             return wbox(f"Participant ({paid}, {person_id}): E-ID is not an int.")
         if event_id < 1:
             return wbox(f"Participant ({paid}, {person_id}): E-ID smaller than 1.")
-        if not self.has("events", ("eid", event_id)):
+        event = self.get_ref("events", "eid", event_id, refs)
+        if event is None:
             return wbox(f"Participant ({paid}, {person_id}): Could not find event with ID.")
 
         if not isinstance(start_date, datetime):
@@ -1522,7 +1646,6 @@ class Database:
         if start_date > end_date:
             return wbox(f"Participant ({paid}, {person_id}): End date begins before start date.")
 
-        event = self.get("events", ("eid", event_id))[0]
         if test_time_frame_outside(event[2], event[3], start_date, end_date) is not None:
             return wbox(f"Participant ({paid}, {person_id}): Timeframe doesnt match parent event.")
 
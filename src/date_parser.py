@@ -0,0 +1,101 @@
+import datetime
+from functools import lru_cache
+from typing import Union
+
+# Number of parsed dates that are kept, files taken in a series share their dates
+DATE_CACHE_SIZE = 4096
+
+# English names as used by strptime (%a, %b, %B) with the default C locale
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+MONTHS = [
+    "january",
+    "february",
+    "march",
+    "april",
+    "may",
+    "june",
+    "july",
+    "august",
+    "september",
+    "october",
+    "november",
+    "december",
+]
+MONTHS_ABBR = [m[:3] for m in MONTHS]
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def parse_exif_date(date: bytes, subsec: Union[bytes, None] = None) -> datetime.datetime:
+    """
+    Parse the exif date (DateTimeOriginal) and if given its fraction (SubSecTimeOriginal),
+    same as strptime with "%Y:%m:%d %H:%M:%S" and "%Y:%m:%d %H:%M:%S.%f".
+    The fixed layout of the exif standard (YYYY:MM:DD HH:MM:SS) is parsed by slicing,
+    other values that strptime accepts (like missing zeros) are parsed by strptime.
+    Raises ValueError for invalid dates.
+    """
+    val = str(date, "ascii")
+    fraction = str(subsec, "ascii") if subsec is not None else None
+
+    if (
+        len(val) == 19
+        and val[4] == val[7] == val[13] == val[16] == ":"
+        and val[10] == " "
+        and (val[0:4] + val[5:7] + val[8:10] + val[11:13] + val[14:16] + val[17:19]).isdigit()
+        and (fraction is None or (0 < len(fraction) <= 6 and fraction.isdigit()))
+    ):
+        return datetime.datetime(
+            int(val[0:4]),
+            int(val[5:7]),
+            int(val[8:10]),
+            int(val[11:13]),
+            int(val[14:16]),
+            int(val[17:19]),
+            # Same as strptime the fraction is padded to microseconds
+            int(fraction.ljust(6, "0")) if fraction is not None else 0,
+        )
+
+    result = datetime.datetime.strptime(val, "%Y:%m:%d %H:%M:%S")
+    if fraction is not None:
+        result = datetime.datetime.strptime(f"{val}.{fraction}", "%Y:%m:%d %H:%M:%S.%f")
+    return result
+
+
+def parse_fields(fields: dict[str, str]) -> Union[datetime.datetime, None]:
+    """
+    Create the date from the fields of a file name signature (see signatures.SIGNATURES),
+    same as strptime would do. Missing fields get the strptime defaults (1900-01-01 00:00:00).
+    Returns None if the signature has no date fields, raises ValueError for invalid dates.
+    """
+    if not fields:
+        return None
+
+    month = int(fields.get("m", 1))
+    # The month number is checked by strptime even if the month name is used instead
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {month}")
+    if "a" in fields and fields["a"].lower() not in WEEKDAYS:
+        raise ValueError(f"Unknown weekday: {fields['a']}")
+    if "b" in fields:
+        month = index_of(MONTHS_ABBR, fields["b"]) + 1
+    # Same as strptime the month name is used instead of the month number
+    if "B" in fields:
+        month = index_of(MONTHS, fields["B"]) + 1
+
+    return datetime.datetime(
+        int(fields.get("Y", 1900)),
+        month,
+        int(fields.get("d", 1)),
+        int(fields.get("H", 0)),
+        int(fields.get("M", 0)),
+        int(fields.get("S", 0)),
+        # Same as strptime the fraction is padded to microseconds
+        int(fields.get("f", "0").ljust(6, "0")),
+    )
+
+
+def index_of(names: list[str], name: str) -> int:
+    """Returns the index of the name (ignoring the case), raises ValueError if unknown."""
+    try:
+        return names.index(name.lower())
+    except ValueError:
+        raise ValueError(f"Unknown name: {name}") from None
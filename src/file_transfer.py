@@ -0,0 +1,293 @@
+import os
+import shutil
+import struct
+import sys
+from os.path import join
+from typing import BinaryIO
+
+# Linux ioctl to clone the content of a file (copy-on-write), see ioctl_ficlone(2)
+FICLONE = 0x40049409
+
+LINK_MODES = ["Copy", "Reflink", "Hardlink"]
+
+# Number of bytes copied per system call, larger chunks need less calls
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Number of threads that move or copy files in parallel
+IO_WORKER_COUNT = 8
+# Number of parallel transfers per target device, spinning disks get slower when seeking
+# between files and network shares are limited by their connection.
+# None allows all I/O workers to transfer to the device.
+DEVICE_LIMITS = {"hdd": 1, "ssd": None, "network": 4}
+NETWORK_FILE_SYSTEMS = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "fuse.sshfs", "9p", "afs"}
+
+
+def same_device(file_with_path: str, directory: str) -> bool:
+    """Returns true if the file and the directory are located on the same device."""
+    try:
+        return os.stat(file_with_path).st_dev == os.stat(directory).st_dev
+    except OSError:
+        return False
+
+
+def device_kind(directory: str) -> str:
+    """
+    Returns the kind of the device the directory is located on: hdd, ssd or network.
+    The kind is only detected on Linux, otherwise the device is handled as ssd.
+    """
+    if file_system(directory) in NETWORK_FILE_SYSTEMS:
+        return "network"
+    try:
+        dev = os.stat(directory).st_dev
+    except OSError:
+        return "ssd"
+    # Partitions do not have a queue, it is located at the parent device
+    block_dir = f"/sys/dev/block/{os.major(dev)}:{os.minor(dev)}"
+    for queue_dir in (join(block_dir, "queue"), join(block_dir, "..", "queue")):
+        try:
+            with open(join(queue_dir, "rotational")) as f:
+                return "hdd" if f.read().strip() == "1" else "ssd"
+        except OSError:
+            pass
+    return "ssd"
+
+
+def case_insensitive(directory: str) -> bool:
+    """
+    Returns true if the file system of the directory ignores the case of file names,
+    like the defaults of Windows and macOS. For this the directory (or its first parent
+    with letters in its name) is looked up with swapped case.
+    """
+    path = os.path.abspath(directory)
+    name = os.path.basename(path)
+    while not os.path.exists(path) or name.swapcase() == name:
+        if (parent := os.path.dirname(path)) == path:
+            return sys.platform in ("win32", "darwin")
+        path, name = parent, os.path.basename(parent)
+    swapped = join(os.path.dirname(path), name.swapcase())
+    try:
+        return os.path.samefile(path, swapped)
+    except OSError:
+        return False
+
+
+def file_system(directory: str) -> str:
+    """Returns the type of the file system the directory is located on, if it is known."""
+    path = os.path.realpath(directory)
+    result, mount_len = "", -1
+    try:
+        with open("/proc/self/mounts") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                # Spaces in the mount point are escaped
+                mount_point = fields[1].replace("\\040", " ")
+                if len(mount_point) > mount_len and (
+                    path == mount_point or path.startswith(join(mount_point, ""))
+                ):
+                    result, mount_len = fields[2], len(mount_point)
+    except OSError:
+        pass
+    return result
+
+
+def move_file(src: str, dst: str, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """
+    Move the file, an existing file at the destination is overwritten.
+    On the same device the file is only renamed, otherwise it is copied and deleted.
+    The source is only deleted if the copy is complete, otherwise OSError is raised.
+    Returns the method that was used.
+    """
+    if same_device(src, os.path.dirname(dst) or "."):
+        try:
+            os.replace(src, dst)
+            return "rename"
+        except OSError:
+            pass
+
+    def copy_complete(s: str, d: str):
+        copy(s, d, chunk_size)
+        if os.path.getsize(d) != os.path.getsize(s):
+            os.remove(d)
+            raise OSError(f"Copy of {s} to {d} is incomplete")
+
+    shutil.move(src, dst, copy_function=copy_complete)
+    return "move"
+
+
+def copy_file(
+    src: str, dst: str, link_mode: str = "Copy", chunk_size: int = COPY_CHUNK_SIZE
+) -> str:
+    """
+    Copy the file, an existing file at the destination is overwritten.
+    Depending on the link mode the content is not duplicated if source and destination
+    are on the same device: Reflink shares the content until one of the files is modified
+    (only supported by some file systems), Hardlink creates a second name for the same file.
+    If linking is not possible the file is copied. Returns the method that was used.
+    """
+    assert link_mode in LINK_MODES
+    if link_mode != "Copy" and same_device(src, os.path.dirname(dst) or "."):
+        try:
+            if link_mode == "Reflink":
+                reflink(src, dst)
+                return "reflink"
+            hardlink(src, dst)
+            return "hardlink"
+        except (OSError, ImportError):
+            pass
+    copy(src, dst, chunk_size)
+    return "copy"
+
+
+def copy(src: str, dst: str, chunk_size: int = COPY_CHUNK_SIZE):
+    """
+    Same as shutil.copy2, but the content is copied in chunks of the given size
+    by the kernel (see copy_data). The metadata (times, permissions) is copied afterwards.
+    """
+    prepare_destination(src, dst)
+    copy_data(src, dst, chunk_size)
+    shutil.copystat(src, dst)
+
+
+def copy_with_exif(src: str, dst: str, exif_bytes: bytes, chunk_size: int = COPY_CHUNK_SIZE):
+    """
+    Copy the .jpg file and replace its exif data with the given bytes (see piexif.dump).
+    Only the header segments are read, the new APP1 segment is placed the same way as
+    piexif.insert does it and the image data is copied like in copy_data.
+    Like this the file is written once instead of being copied and rewritten afterwards.
+    Raises ValueError if the file is not a valid .jpg, in this case nothing is written.
+    """
+    prepare_destination(src, dst)
+    app1 = b"\xff\xe1" + struct.pack(">H", len(exif_bytes) + 2) + exif_bytes
+    with open(src, "rb") as f_src:
+        segments = read_jpeg_header(f_src)
+
+        if len(segments) > 1 and segments[1][0:2] == b"\xff\xe0":
+            if len(segments) > 2 and is_exif_segment(segments[2]):
+                # The exif segment replaces the APP0 segment
+                segments[2] = app1
+                segments.pop(1)
+            else:
+                segments[1] = app1
+        elif len(segments) > 1 and is_exif_segment(segments[1]):
+            segments[1] = app1
+        else:
+            segments.insert(1, app1)
+
+        with open(dst, "wb") as f_dst:
+            f_dst.write(b"".join(segments))
+            f_dst.flush()
+            copy_range(f_src, f_dst, f_src.tell(), chunk_size)
+    shutil.copystat(src, dst)
+
+
+def read_jpeg_header(f_src: BinaryIO) -> list[bytes]:
+    """
+    Read the segments of the .jpg file up to the start of the image data (SOS marker).
+    Afterwards the file position is the start of the image data.
+    """
+    segments = [f_src.read(2)]
+    if segments[0] != b"\xff\xd8":
+        raise ValueError(f"{f_src.name} is not a .jpg file")
+    while (marker := f_src.read(4))[0:2] != b"\xff\xda":
+        if len(marker) < 4 or marker[0:1] != b"\xff":
+            raise ValueError(f"{f_src.name} has no valid .jpg header")
+        length = struct.unpack(">H", marker[2:4])[0]
+        segments.append(marker + f_src.read(length - 2))
+    f_src.seek(-len(marker), os.SEEK_CUR)
+    return segments
+
+
+def is_exif_segment(segment: bytes) -> bool:
+    return segment[0:2] == b"\xff\xe1" and segment[4:10] == b"Exif\x00\x00"
+
+
+def prepare_destination(src: str, dst: str):
+    """Make sure that writing the destination does not change the source."""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        if os.path.abspath(src) == os.path.abspath(dst):
+            raise shutil.SameFileError(f"{src} and {dst} are the same file")
+        # The destination is a hardlink of the source, writing to it would change the source
+        os.remove(dst)
+
+
+def copy_data(src: str, dst: str, chunk_size: int = COPY_CHUNK_SIZE) -> str:
+    """
+    Copy the content of the file without reading it into userspace buffers.
+    For this os.copy_file_range is used, if not supported os.sendfile and
+    as last fallback a buffered copy. Returns the method that was used.
+    """
+    with open(src, "rb") as f_src, open(dst, "wb") as f_dst:
+        return copy_range(f_src, f_dst, 0, chunk_size)
+
+
+def copy_range(f_src: BinaryIO, f_dst: BinaryIO, offset: int, chunk_size: int) -> str:
+    """
+    Copy the content of the source file from the given offset to the end of the
+    destination file, see copy_data. Returns the method that was used.
+    """
+    in_fd, out_fd = f_src.fileno(), f_dst.fileno()
+    dst_offset = f_dst.tell()
+    size = os.fstat(in_fd).st_size
+    for name, func in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile)):
+        try:
+            # Only the first call decides whether the method is supported
+            copied = func(in_fd, out_fd, offset, dst_offset, chunk_size)
+        except (OSError, AttributeError):
+            continue
+        if copied == 0 and offset < size:
+            # Some file systems do not copy anything instead of failing (like in shutil)
+            continue
+        while copied > 0:
+            offset += copied
+            dst_offset += copied
+            copied = func(in_fd, out_fd, offset, dst_offset, chunk_size)
+        return name
+
+    f_src.seek(offset)
+    shutil.copyfileobj(f_src, f_dst, chunk_size)
+    return "copyfileobj"
+
+
+def _copy_file_range(in_fd: int, out_fd: int, offset: int, dst_offset: int, count: int) -> int:
+    return os.copy_file_range(in_fd, out_fd, count, offset, dst_offset)
+
+
+def _sendfile(in_fd: int, out_fd: int, offset: int, dst_offset: int, count: int) -> int:
+    # The output file is written at its current position, which is the same as dst_offset
+    return os.sendfile(out_fd, in_fd, offset, count)
+
+
+def reflink(src: str, dst: str):
+    """Clone the content of the file with the FICLONE ioctl, raises OSError if unsupported."""
+    import fcntl
+
+    with open(src, "rb") as f_src:
+        # The destination is only replaced if cloning succeeded
+        tmp = dst + ".reflink"
+        try:
+            with open(tmp, "wb") as f_dst:
+                fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dst)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+
+def hardlink(src: str, dst: str):
+    """Create a hard link, an existing file at the destination is replaced."""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    if not os.path.exists(dst):
+        os.link(src, dst)
+        return
+    tmp = dst + ".hardlink"
+    os.link(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        os.remove(tmp)
+        raise
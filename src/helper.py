@@ -1,16 +1,22 @@
-from datetime import datetime
-from tkinter import Tk, Toplevel, messagebox
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Union
 
 from debug_messages import InfoCodes, WarningCodes
 
+# tkinter is only imported when needed, such that the sorter can run without it
+if TYPE_CHECKING:
+    from tkinter import Tk, Toplevel
+
 
 def wbox(msg: str):
     """Show warning box for validation error."""
+    from tkinter import messagebox
+
     messagebox.showwarning(title="Validation Error!", message=msg)
     return InfoCodes.VAL_ERROR
 
 
-def center_window(window: Toplevel):
+def center_window(window: "Toplevel"):
     """Centers the given window on the screen."""
     window.update()
     window_width = window.winfo_width()
@@ -32,7 +38,7 @@ def center_window(window: Toplevel):
     window.geometry("")
 
 
-def lt_window(window: Tk):
+def lt_window(window: "Tk"):
     """Aligns the given window at the left side of the screen (with margin)."""
     window.update()
     window_width = window.winfo_width()
@@ -90,3 +96,18 @@ def test_time_frame_swap(test_frame_start: datetime, test_frame_end: datetime):
     if test_frame_end < test_frame_start:
         return WarningCodes.WARNING_DATE_SWAP
     return None
+
+
+def parse_time_shift(time_shift: str) -> Union[timedelta, None]:
+    """
+    Convert the time shift of an artist (days:hours:minutes:seconds) to a timedelta.
+    Returns None if the string is not of this form.
+    """
+    shift = time_shift.split(":")
+    if len(shift) != 4:
+        return None
+    try:
+        d, h, m, s = [int(x) for x in shift]
+    except ValueError:
+        return None
+    return timedelta(days=d, hours=h, minutes=m, seconds=s)
@@ -0,0 +1,82 @@
+import queue
+from typing import Any
+
+
+class GuiInteraction:
+    """
+    User interaction of the sorter via tkinter dialogs.
+    The GUI modules are only imported when a dialog is shown,
+    such that the sorter itself does not depend on tkinter.
+    """
+
+    def show_error(self, message: str):
+        """Show an error message to the user."""
+        from tkinter import messagebox
+
+        messagebox.showinfo(message=message, title="Error")
+
+    def select(
+        self,
+        title: str,
+        message: str,
+        actioncall: str,
+        options: list[tuple[str, ...]],
+        default: int = 0,
+    ) -> int:
+        """
+        Let the user select one of the given options, returns the index of the selection.
+        Each option is given as tuple of the values that are shown for it.
+        The default option is only used when there is no user to ask.
+        """
+        from guiboxes.basebox import SEPARATOR
+        from guiboxes.selectionbox import SelectionBox
+
+        box = SelectionBox(
+            title=title,
+            message=message,
+            actioncall=actioncall,
+            options=[SEPARATOR.join((str(i),) + opt) for i, opt in enumerate(options)],
+        )
+        return int(box.choice.get().split(SEPARATOR)[0])
+
+    def ask(self, title: str, msg: str, again: Any, b1: str = "Yes", b2: str = "No") -> bool:
+        """Ask the user a yes/no question, returns true if the first option was chosen."""
+        from guiboxes.messagebox import MessageBox
+
+        box = MessageBox(title=title, msg=msg, again=again, b1=b1, b2=b2)
+        return box.choice
+
+
+class HeadlessInteraction:
+    """
+    Replacement of the dialogs when running without GUI.
+    Since there is no user to ask, the default option is selected for selections, which keeps
+    the matched event, and questions are answered with the second option,
+    which never overwrites or deletes data.
+    All decisions are reported via the text queue.
+    """
+
+    def __init__(self, text_queue: queue.Queue):
+        """Setup the interaction with the queue used for reporting."""
+        self.text_queue = text_queue
+
+    def show_error(self, message: str):
+        """Report the error message."""
+        self.text_queue.put(f"Error: {message}\n")
+
+    def select(
+        self,
+        title: str,
+        message: str,
+        actioncall: str,
+        options: list[tuple[str, ...]],
+        default: int = 0,
+    ) -> int:
+        """Select the default option."""
+        self.text_queue.put(f"{title} {message} Selected: {', '.join(options[default])}.\n")
+        return default
+
+    def ask(self, title: str, msg: str, again: Any, b1: str = "Yes", b2: str = "No") -> bool:
+        """Answer the question with the second option."""
+        self.text_queue.put(f"{title} {msg} Selected: {b2}.\n")
+        return False
@@ -0,0 +1,68 @@
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Sequence
+
+import numpy as np
+
+
+class IntervalIndex:
+    """
+    In-memory index for database rows with a start and an end date (like events).
+    It allows to find all rows whose time frame contains a given date without
+    querying the database. For this the rows are sorted by their start date and
+    for each position the maximum end date of all rows up to this position is stored.
+    A lookup uses bisect to find the last row starting before the date and walks back
+    only as long as an earlier row could still end after the date.
+    Many dates can be looked up at once with numpy, see get_by_dates.
+    """
+
+    def __init__(self, rows: Sequence[Sequence[Any]], s_idx: int, e_idx: int):
+        """Build the index for the given rows and the positions of their dates."""
+        self.e_idx = e_idx
+        self.rows = sorted(rows, key=lambda r: r[s_idx])
+        self.starts = [r[s_idx] for r in self.rows]
+
+        self.max_ends: list[datetime] = []
+        for row in self.rows:
+            end = row[e_idx]
+            self.max_ends.append(max(end, self.max_ends[-1]) if self.max_ends else end)
+
+        # Same as above, but as numpy arrays for searching many dates at once
+        self.starts_array = np.array(self.starts, dtype="datetime64[us]")
+        self.max_ends_array = np.array(self.max_ends, dtype="datetime64[us]")
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get_by_date(self, date: datetime) -> list[Sequence[Any]]:
+        """
+        Returns all rows with start_date <= date <= end_date.
+        Same as the database the rows are ordered by their id.
+        """
+        result = []
+        idx = bisect_right(self.starts, date) - 1
+        while idx >= 0 and self.max_ends[idx] >= date:
+            if self.rows[idx][self.e_idx] >= date:
+                result.append(self.rows[idx])
+            idx -= 1
+
+        result.sort(key=lambda r: r[0])
+        return result
+
+    def get_by_dates(self, dates: Sequence[datetime]) -> list[list[Sequence[Any]]]:
+        """
+        Same as get_by_date for each of the given dates, but all dates are searched at once.
+        Since the maximum end dates are sorted as well, the rows that can contain a date
+        are all rows between the first row whose maximum end is not before the date and
+        the last row starting before the date. Both are found with one searchsorted call.
+        """
+        values = np.array(dates, dtype="datetime64[us]")
+        firsts = np.searchsorted(self.max_ends_array, values, side="left").tolist()
+        lasts = np.searchsorted(self.starts_array, values, side="right").tolist()
+
+        result = []
+        for date, first, last in zip(dates, firsts, lasts):
+            rows = [row for row in self.rows[first:last] if row[self.e_idx] >= date]
+            rows.sort(key=lambda r: r[0])
+            result.append(rows)
+        return result
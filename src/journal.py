@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+from typing import Any
+
+from plan import Operation
+
+# Default file of the journal (in the current working directory)
+JOURNAL_FILE = "sort_journal.jsonl"
+
+
+class Journal:
+    """
+    Write-ahead journal of the file operations of a sorting run, used to resume runs that
+    were interrupted. The planned operations are saved before they are executed and each
+    completed operation is saved afterwards. The journal is an append-only JSONL file,
+    which is deleted when the run finishes. The journal is safe to use from multiple threads.
+    """
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+        # Operations of the interrupted run that were planned but not completed
+        self.pending: list[Operation] = []
+        # Source files of the interrupted run that were already moved or copied
+        self.completed: set[str] = set()
+
+    def open(self, source: str, target: str) -> bool:
+        """
+        Open the journal for the run with the given directories.
+        If the journal of an interrupted run with the same directories exists, it is continued
+        and True is returned. Otherwise a new journal is started.
+        Raises FileExistsError if the journal belongs to an interrupted run of other directories,
+        in this case the journal is kept unchanged.
+        """
+        header = {"source": os.path.abspath(source), "target": os.path.abspath(target)}
+        resume = False
+        if os.path.exists(self.path):
+            entries, end = self.read()
+            if len(entries) > 0 and entries[0] != header and self.is_header(entries[0]):
+                raise FileExistsError(f"{self.path} is the journal of other directories")
+            resume = len(entries) > 0 and entries[0] == header
+            if resume:
+                try:
+                    self.load(entries[1:])
+                except (KeyError, TypeError, ValueError):
+                    # The journal is not valid, the run is started again
+                    self.pending, self.completed = [], set()
+                    resume = False
+            if resume:
+                # Remove a line that was not written completely, new entries follow the last one
+                os.truncate(self.path, end)
+
+        self.file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if not resume:
+            self.write(header, sync=True)
+        return resume
+
+    def read(self) -> tuple[list[dict[str, Any]], int]:
+        """
+        Returns all entries and the size of the journal up to the end of the last entry,
+        a line that was not written completely ends the journal.
+        """
+        entries, end = [], 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line.decode("utf-8")))
+                except ValueError:
+                    break
+                end += len(line)
+        return entries, end
+
+    @staticmethod
+    def is_header(entry: dict[str, Any]) -> bool:
+        """Returns true if the entry is the first line of a journal, naming its directories."""
+        return isinstance(entry, dict) and entry.keys() == {"source", "target"}
+
+    def load(self, entries: list[dict[str, Any]]):
+        """Collect the pending and completed operations of the interrupted run."""
+        planned: dict[tuple[str, str], Operation] = {}
+        for entry in entries:
+            if "done" in entry:
+                planned.pop((entry["done"], entry["dst"]), None)
+                self.completed.add(entry["done"])
+            else:
+                operation = Operation.from_dict(entry)
+                planned[(operation.src, operation.dst)] = operation
+        self.pending = list(planned.values())
+
+    def plan(self, operations: list[Operation]):
+        """Save the operations before they are executed."""
+        with self.lock:
+            for operation in operations:
+                self.write(operation.to_dict())
+            self.sync()
+
+    def done(self, operation: Operation):
+        """
+        Save the completed operation. The line is only flushed to the operating system,
+        such that the journal survives if the application is closed.
+        """
+        with self.lock:
+            self.write({"done": operation.src, "dst": operation.dst})
+
+    def close(self, delete: bool = False):
+        """Close the journal, after a finished run it is not needed anymore."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if delete and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def write(self, entry: dict[str, Any], sync: bool = False):
+        assert self.file is not None
+        self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.file.flush()
+        if sync:
+            self.sync()
+
+    def sync(self):
+        """Write the journal to the disk, such that it also survives a crash of the system."""
+        assert self.file is not None
+        self.file.flush()
+        os.fsync(self.file.fileno())
@@ -1,19 +1,51 @@
 import queue
 from os.path import isfile, join
-from tkinter import BooleanVar, IntVar, StringVar
+from typing import Any
+
+from file_transfer import COPY_CHUNK_SIZE, IO_WORKER_COUNT, LINK_MODES
+from journal import JOURNAL_FILE
+from metadata_cache import CACHE_FILE
+from plan import PLAN_FILE
+
+
+class Value:
+    """Plain replacement for the tkinter variables, used when running without GUI."""
+
+    def __init__(self, value: Any = None):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value: Any):
+        self.value = value
 
 
 class MetaInformation:
     """Collection class for all kinds of metainformation and program settings."""
 
-    def __init__(self):
-        """Setup all meta information."""
+    def __init__(self, headless: bool = False):
+        """
+        Setup all meta information. If headless the settings are stored in plain values
+        instead of tkinter variables, such that tkinter is not needed.
+        """
+        if headless:
+            BooleanVar = IntVar = StringVar = Value
+        else:
+            from tkinter import BooleanVar, IntVar, StringVar
+        self.headless = headless
+        self.string_var = StringVar
+
         self.finished = True
 
         self.file_count = 0
         self.file_count_max = 1
         self.estimated_time_per_file_ms = 100
         self.estimated_time_ms = 0
+        # Number of bytes copied per system call when copying or moving files between devices
+        self.copy_chunk_size = COPY_CHUNK_SIZE
+        # Number of threads that move or copy the files, see Sorter.execute_plan
+        self.io_worker_count = IO_WORKER_COUNT
 
         self.modify_meta = IntVar()
         self.modify_meta.set(1)
@@ -23,12 +55,33 @@ class MetaInformation:
         self.recursive.set(1)
         self.copy_files = IntVar()
         self.copy_files.set(1)
+        # On the same device copies can be links instead, see file_transfer.copy_file
+        self.link_mode = StringVar()
+        self.link_mode.set(self.get_link_modes()[0])
         self.process_unmatched = IntVar()
         self.process_unmatched.set(1)
         self.require_artist = IntVar()
         self.require_artist.set(1)
         self.process_samename = IntVar()
         self.process_samename.set(1)
+        # Number of threads used for analysing the files, 1 processes all files serially
+        self.worker_count = IntVar()
+        self.worker_count.set(1)
+        self.use_cache = IntVar()
+        self.use_cache.set(1)
+        self.cache_file = StringVar()
+        self.cache_file.set(CACHE_FILE)
+        # Files that need a user decision are processed at the end of the run
+        self.defer_conflicts = IntVar()
+        self.defer_conflicts.set(0)
+        # A dry run only saves the planned file operations to the plan file
+        self.dry_run = IntVar()
+        self.dry_run.set(0)
+        self.plan_file = StringVar()
+        self.plan_file.set(PLAN_FILE)
+        # Journal of the file operations, used to resume interrupted runs (see journal.Journal)
+        self.journal_file = StringVar()
+        self.journal_file.set(JOURNAL_FILE)
         self.dont_ask_again_fnum = BooleanVar()
         self.dont_ask_again_fnum.set(False)
         self.dont_ask_again_thumb = BooleanVar()
@@ -51,17 +104,17 @@ class MetaInformation:
 
     def set_dirs(self, img_src: str, img_tgt: str, db_src: str, db_tgt: str):
         """Set the source and target directories for the images and the database."""
-        self.img_src = StringVar()
+        self.img_src = self.string_var()
         self.img_src.set(img_src)
-        self.img_tgt = StringVar()
+        self.img_tgt = self.string_var()
         self.img_tgt.set(img_tgt)
 
-        self.sv_db_src = StringVar()
+        self.sv_db_src = self.string_var()
         if isfile(join(db_src, "db.json")):
             self.sv_db_src.set(join(db_src, "db.json"))
         else:
             self.sv_db_src.set(join(db_src, ""))
-        self.sv_db_tgt = StringVar()
+        self.sv_db_tgt = self.string_var()
         if isfile(join(db_tgt, "db.json")):
             self.sv_db_tgt.set(join(db_tgt, "db.json"))
         else:
@@ -95,6 +148,10 @@ class MetaInformation:
             "Event-Subevent",
         ]
 
+    def get_link_modes(self):
+        """Returns all modes that can be used for copying files."""
+        return LINK_MODES
+
     def get_read_choices(self):
         """Returns all signatures supported for file and information reading."""
         return [
@@ -104,44 +161,6 @@ class MetaInformation:
             "Filename only",
         ]
 
-    def get_signature_regex(self):
-        """
-        List of regex for supported filesignatures.
-        Each regex allows for additional name information after the date,
-        but the file must start either with the date or with three charaters
-        indicating the file type e.g. IMG/MVI/VID/RAW
-        """
-        return [
-            r"^(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}\.\d{3})",
-            r"^(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})",
-            r"^(\d{8}_\d{6})",
-            r"^\w{3}_(\d{8}_\d{6})",
-            r"^(\w{3}\s\w{3}\s\d{2}\s\d{2}-\d{2}-\d{2}\s\d{4})",
-            r"^(\d{2}-\w*-\d{2}_\d{3})",
-            r"^(\d{4}_\[\d{2}_\d{2}\])",
-            r"^(\d{4}_\[\d{2}_\d{2})-\d{2}_\d{2}\]",
-            r"^(\w{3}_\d{4})",
-            r"^\w{3}-(\d{8})-",
-        ]
-
-    def get_signature_strptime(self):
-        """
-        Returns a list of regexes for reading the datetime from a string.
-        """
-        return [
-            "%Y-%m-%d_%H-%M-%S.%f",
-            "%Y-%m-%d_%H-%M-%S",
-            "%Y%m%d_%H%M%S",
-            "%Y%m%d_%H%M%S",
-            "%a %b %d %H-%M-%S %Y",
-            # OBACHT: Year is not accessable
-            "%m-%B-%d_%f",
-            "%Y_[%m_%d]",
-            "%Y_[%m_%d",
-            "",
-            "%Y%m%d",
-        ]
-
     def update_estimated_time(self, filecount: int):
         """Update the time estimate for how long the program will continue to run."""
         self.estimated_time_ms = filecount * self.estimated_time_per_file_ms
@@ -0,0 +1,176 @@
+import struct
+from typing import Any, Union
+
+import piexif
+
+# Tags of the 0th IFD that are read by the header reader
+TAG_MAKE = piexif.ImageIFD.Make
+TAG_MODEL = piexif.ImageIFD.Model
+TAG_ARTIST = piexif.ImageIFD.Artist
+TAG_EXIF_IFD = piexif.ImageIFD.ExifTag
+# Tags of the Exif IFD that are read by the header reader
+TAG_DATE_ORIGINAL = piexif.ExifIFD.DateTimeOriginal
+TAG_SUBSEC_ORIGINAL = piexif.ExifIFD.SubSecTimeOriginal
+# Tags that are needed for sorting, these are also the tags stored in the metadata cache
+SORT_TAGS = (TAG_DATE_ORIGINAL, TAG_SUBSEC_ORIGINAL, TAG_ARTIST, TAG_MAKE, TAG_MODEL)
+
+TYPE_BYTE = 1
+TYPE_ASCII = 2
+TYPE_UNDEFINED = 7
+
+
+class ImageMetadata:
+    """
+    Exif metadata of an image. The file is only read once and the
+    values needed for the sorting are shared by all processing steps.
+    Only the tags needed for sorting are parsed, the complete exif dict
+    is parsed on demand (for example for the metadata modification).
+    """
+
+    def __init__(
+        self, exif_segment: Union[bytes, None], tags: Union[dict[int, bytes], None] = None
+    ):
+        """
+        Extract the values used for sorting from the given exif segment.
+        Alternatively the already extracted tags can be given (for example from a cache),
+        in this case the exif segment is unknown and the exif dict is not available.
+        """
+        # Exif segment starting with b"Exif\x00\x00", None if the image has no exif data
+        self.exif_segment = exif_segment
+        self.exif_read = tags is None
+        self._exif_dict: Union[dict[str, Any], None] = None
+
+        if tags is None:
+            tags = read_exif_tags(exif_segment[6:]) if exif_segment else {}
+        # Raw values of all tags needed for sorting
+        self.tags = tags
+
+        # The date values are kept as raw bytes, since they are parsed by the sorter
+        self.date_original: Union[bytes, None] = tags.get(TAG_DATE_ORIGINAL)
+        self.subsec_original: Union[bytes, None] = tags.get(TAG_SUBSEC_ORIGINAL)
+
+        self.artist = get_exif_value(tags, TAG_ARTIST)
+        self.make = get_exif_value(tags, TAG_MAKE)
+        self.model = get_exif_value(tags, TAG_MODEL)
+
+    @property
+    def exif_dict(self) -> Union[dict[str, Any], None]:
+        """
+        The complete piexif dict of the image, parsed on first access.
+        Returns None if the exif segment of the image was not read.
+        """
+        if not self.exif_read:
+            return None
+        if self._exif_dict is None:
+            if self.exif_segment:
+                self._exif_dict = piexif.load(self.exif_segment)
+            else:
+                self._exif_dict = {
+                    "0th": {},
+                    "Exif": {},
+                    "GPS": {},
+                    "Interop": {},
+                    "1st": {},
+                    "thumbnail": None,
+                }
+        return self._exif_dict
+
+
+def load_metadata(file_with_path: str):
+    """Read the exif metadata of the given file."""
+    return ImageMetadata(read_exif_segment(file_with_path))
+
+
+def load_exif_dict(file_with_path: str) -> dict[str, Any]:
+    """Read the complete piexif dict of the given file, without reading the image data."""
+    return ImageMetadata(read_exif_segment(file_with_path)).exif_dict
+
+
+def read_exif_segment(file_with_path: str) -> Union[bytes, None]:
+    """
+    Read the exif (APP1) segment of a jpeg file without reading the image data.
+    For this the segment headers at the start of the file are read one after another
+    and all other segments are skipped, until the exif segment or the image data is reached.
+    Returns the segment content starting with b"Exif\\x00\\x00" or None if there is none.
+    """
+    with open(file_with_path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            raise piexif.InvalidImageDataError("Given file is not a jpeg.")
+
+        while len(head := f.read(4)) == 4:
+            # Segments always start with a marker, otherwise the header is broken
+            if head[0:1] != b"\xff":
+                break
+            # Start of scan (image data) or end of image, there will be no exif segment
+            if head[0:2] in (b"\xff\xda", b"\xff\xd9"):
+                break
+
+            length = struct.unpack(">H", head[2:4])[0]
+            if head[0:2] == b"\xff\xe1":
+                segment = f.read(length - 2)
+                if segment[0:6] == b"Exif\x00\x00":
+                    return segment
+            else:
+                f.seek(length - 2, 1)
+
+    return None
+
+
+def read_exif_tags(tiff: bytes) -> dict[int, bytes]:
+    """
+    Minimal tiff reader that only extracts the tags needed for sorting from the 0th
+    and the Exif IFD. The values are returned as bytes in the same way as piexif does.
+    Malformed data ends the parsing, in this case only the already read tags are returned.
+    """
+    tags: dict[int, bytes] = {}
+    endian = "<" if tiff[0:2] == b"II" else ">"
+
+    try:
+        pointer = struct.unpack(endian + "L", tiff[4:8])[0]
+        read_ifd(tiff, endian, pointer, (TAG_MAKE, TAG_MODEL, TAG_ARTIST, TAG_EXIF_IFD), tags)
+
+        if TAG_EXIF_IFD in tags:
+            pointer = struct.unpack(endian + "L", tags.pop(TAG_EXIF_IFD))[0]
+            read_ifd(tiff, endian, pointer, (TAG_DATE_ORIGINAL, TAG_SUBSEC_ORIGINAL), tags)
+    except struct.error:
+        pass
+
+    return tags
+
+
+def read_ifd(
+    tiff: bytes, endian: str, pointer: int, wanted: tuple[int, ...], tags: dict[int, bytes]
+):
+    """Read the wanted tags of the IFD at the given position into the tags dict."""
+    count = struct.unpack(endian + "H", tiff[pointer : pointer + 2])[0]
+    for i in range(count):
+        entry = pointer + 2 + 12 * i
+        tag, v_type, length = struct.unpack(endian + "HHL", tiff[entry : entry + 8])
+        if tag not in wanted:
+            continue
+
+        value = tiff[entry + 8 : entry + 12]
+        # The pointer to the Exif IFD is kept as raw value
+        if tag == TAG_EXIF_IFD:
+            tags[tag] = value
+            continue
+        if v_type not in (TYPE_ASCII, TYPE_BYTE, TYPE_UNDEFINED):
+            continue
+
+        # Values longer than four bytes are stored at the given offset
+        if length > 4:
+            offset = struct.unpack(endian + "L", value)[0]
+            value = tiff[offset : offset + length]
+        else:
+            value = value[0:length]
+        # Same as piexif the terminating null byte of strings is removed
+        tags[tag] = value[:-1] if v_type == TYPE_ASCII else value
+
+
+def get_exif_value(tags: dict[int, bytes], key: int):
+    """Get the string value for the given exif tag."""
+    if key in tags:
+        val = str(tags[key], "ascii").strip().strip("\x00")
+        if len(val) > 0:
+            return val
+    return None
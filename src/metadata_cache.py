@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+from typing import Union
+
+from metadata import SORT_TAGS, ImageMetadata
+
+# Maximum number of files kept in the cache, the least recently used files are removed first
+MAX_ENTRIES = 500000
+# Number of cache writes after which the changes are committed
+COMMIT_INTERVAL = 1000
+# Default file of the cache (in the current working directory)
+CACHE_FILE = "metadata_cache.db"
+
+
+class MetadataCache:
+    """
+    Persistent cache for the exif values of already processed files.
+    A file is identified by its path, size and modification time, such that
+    changed files are parsed again. The cache is safe to use from multiple threads.
+    """
+
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = MAX_ENTRIES):
+        """Setup the cache database."""
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.changes = 0
+        # Timestamp of this run, used to find the least recently used files
+        self.run_time = int(time.time())
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files( \
+            path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, \
+            date_original BLOB, subsec_original BLOB, artist BLOB, make BLOB, model BLOB, \
+            last_used INTEGER)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+        self.conn.commit()
+
+    def close(self):
+        """Remove the least recently used files if the cache is too big and save all changes."""
+        with self.lock:
+            self.evict()
+            self.conn.commit()
+            self.conn.close()
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Union[ImageMetadata, None]:
+        """Returns the cached metadata of the file, None if the file is unknown or changed."""
+        with self.lock:
+            cur = self.conn.execute(
+                "SELECT date_original, subsec_original, artist, make, model FROM files \
+                WHERE path=? AND size=? AND mtime_ns=?",
+                (path, size, mtime_ns),
+            )
+            row = cur.fetchone()
+            cur.close()
+            if row is None:
+                return None
+
+            self.conn.execute("UPDATE files SET last_used=? WHERE path=?", (self.run_time, path))
+            self.count_change()
+
+        tags = {tag: value for tag, value in zip(SORT_TAGS, row) if value is not None}
+        return ImageMetadata(None, tags)
+
+    def put(self, path: str, size: int, mtime_ns: int, meta: ImageMetadata):
+        """Add or replace the cached metadata of the file."""
+        values = tuple(meta.tags.get(tag) for tag in SORT_TAGS)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, size, mtime_ns) + values + (self.run_time,),
+            )
+            self.count_change()
+
+    def count_change(self):
+        """Commit the changes regularly, such that they are not lost if the program is closed."""
+        self.changes += 1
+        if self.changes >= COMMIT_INTERVAL:
+            self.conn.commit()
+            self.changes = 0
+
+    def evict(self):
+        """Delete the least recently used files, such that the cache does not grow forever."""
+        cur = self.conn.execute("SELECT COUNT(*) FROM files")
+        count = cur.fetchone()[0]
+        cur.close()
+
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM files WHERE path IN \
+                (SELECT path FROM files ORDER BY last_used ASC LIMIT ?)",
+                (count - self.max_entries,),
+            )
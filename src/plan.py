@@ -0,0 +1,91 @@
+import datetime
+import json
+import os
+from typing import Any, Union
+
+# Default file the plan of a dry run is saved to (in the current working directory)
+PLAN_FILE = "sort_plan.jsonl"
+OPERATIONS = ("copy", "move")
+# Number of operations after which the plan is executed while sorting,
+# this limits the memory used by the prepared metadata of the operations
+PLAN_BATCH_SIZE = 256
+
+
+class Operation:
+    """
+    A single file operation of a plan: the source file is copied or moved to the destination.
+    If metadata is given it is written to the destination (see Sorter.get_meta_fields).
+    Exif bytes that were already prepared for the destination are only kept in memory.
+    """
+
+    def __init__(
+        self,
+        op: str,
+        src: str,
+        dst: str,
+        meta: Union[dict[str, Any], None] = None,
+        exif_bytes: Union[bytes, None] = None,
+    ):
+        assert op in OPERATIONS
+        self.op = op
+        self.src = src
+        self.dst = dst
+        # Keys: title, artist, date
+        self.meta = meta
+        self.exif_bytes = exif_bytes
+
+    def to_dict(self) -> dict[str, Any]:
+        meta = None
+        if self.meta is not None:
+            date = self.meta["date"]
+            meta = dict(self.meta, date=date.isoformat() if date is not None else None)
+        return {"op": self.op, "src": self.src, "dst": self.dst, "meta": meta}
+
+    @staticmethod
+    def from_dict(values: dict[str, Any]) -> "Operation":
+        if values["op"] not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {values['op']}")
+        meta = values.get("meta")
+        if meta is not None:
+            date = meta["date"]
+            meta = dict(meta, date=datetime.datetime.fromisoformat(date) if date else None)
+        return Operation(values["op"], values["src"], values["dst"], meta)
+
+
+class Plan:
+    """
+    List of all file operations of a sorting run, in the order they are executed.
+    A dry run only creates the plan, which can be reviewed and executed later.
+    The plan is saved as JSONL file, with one operation per line.
+    """
+
+    def __init__(self, operations: Union[list[Operation], None] = None):
+        self.operations = operations if operations is not None else []
+
+    def __len__(self):
+        return len(self.operations)
+
+    def add(self, operation: Operation):
+        self.operations.append(operation)
+
+    def directories(self) -> list[str]:
+        """Returns all destination directories, each only once and parents first."""
+        return sorted({os.path.dirname(operation.dst) for operation in self.operations})
+
+    def save(self, file: str):
+        with open(file, "w", encoding="utf-8") as f:
+            for operation in self.operations:
+                f.write(json.dumps(operation.to_dict(), ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def load(file: str) -> "Plan":
+        """Load the plan from the JSONL file, raises ValueError if a line is not valid."""
+        operations = []
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        operations.append(Operation.from_dict(json.loads(line)))
+                    except (KeyError, TypeError) as e:
+                        raise ValueError(f"Invalid operation in plan: {line}") from e
+        return Plan(operations)
@@ -0,0 +1,92 @@
+import os
+import queue
+import threading
+from typing import Callable, Iterator, Union
+
+# Maximum number of scanned directories that wait for being processed
+SCAN_QUEUE_SIZE = 16
+
+
+def scan_tree(directory: str, recursive: bool) -> Iterator[tuple[str, list[os.DirEntry], bool]]:
+    """
+    Scan the directory with os.scandir and yield for each directory its path,
+    the entries of its files and whether the directory is completely empty.
+    The entries cache their file type and stat information, such that no further
+    system calls are needed for them. If recursive the subdirectories are scanned
+    after their parent directory, in the same order as os.walk does.
+    Symbolic links to directories are not followed and unreadable directories are skipped.
+    """
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return
+
+    files = []
+    sub_dirs = []
+    for entry in entries:
+        # The type of some entries can not be read, these are skipped as well
+        try:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    sub_dirs.append(entry.path)
+            elif entry.is_file():
+                files.append(entry)
+        except OSError:
+            continue
+
+    yield directory, files, len(entries) == 0
+
+    if recursive:
+        for sub_dir in sub_dirs:
+            yield from scan_tree(sub_dir, recursive)
+
+
+def scan_tree_threaded(
+    directory: str,
+    recursive: bool,
+    on_dir: Callable[[str, list[os.DirEntry]], None],
+    maxsize: int = SCAN_QUEUE_SIZE,
+) -> Iterator[tuple[str, list[os.DirEntry], bool]]:
+    """
+    Same as scan_tree, but the scan runs in its own thread and fills a bounded queue.
+    Like this the first directories can be processed while the rest of the tree is scanned.
+    The on_dir callback is called by the scan thread for each scanned directory,
+    for example to update the number of files found so far.
+    An exception of the scan thread is raised again after the already scanned directories.
+    """
+    results: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+    errors: list[Exception] = []
+
+    def put(result: Union[tuple[str, list[os.DirEntry], bool], None]):
+        """Put the result into the queue, unless the consumer stopped."""
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def scan():
+        try:
+            for result in scan_tree(directory, recursive):
+                on_dir(result[0], result[1])
+                put(result)
+                if stop.is_set():
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            # Marks the end of the scan, such that the consumer does not wait forever
+            put(None)
+
+    thread = threading.Thread(target=scan, daemon=True)
+    thread.start()
+    try:
+        while (result := results.get()) is not None:
+            yield result
+        if errors:
+            raise errors[0]
+    finally:
+        stop.set()
@@ -0,0 +1,56 @@
+import re
+from typing import Union
+
+# List of regex for supported filesignatures.
+# Each regex allows for additional name information after the date,
+# but the file must start either with the date or with three charaters
+# indicating the file type e.g. IMG/MVI/VID/RAW
+# The date fields are named groups with the same names as the strptime directives:
+# Y year, m month, d day, H hour, M minute, S second, f fraction,
+# a weekday name, b abbreviated month name and B month name.
+# OBACHT: Signatures without date fields are supported, but give no date.
+SIGNATURES = [
+    r"^(?P<Y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})_(?P<H>\d{2})-(?P<M>\d{2})-(?P<S>\d{2})"
+    r"\.(?P<f>\d{3})",
+    r"^(?P<Y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})_(?P<H>\d{2})-(?P<M>\d{2})-(?P<S>\d{2})",
+    r"^(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})_(?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2})",
+    r"^\w{3}_(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})_(?P<H>\d{2})(?P<M>\d{2})(?P<S>\d{2})",
+    r"^(?P<a>\w{3})\s(?P<b>\w{3})\s(?P<d>\d{2})\s(?P<H>\d{2})-(?P<M>\d{2})-(?P<S>\d{2})"
+    r"\s(?P<Y>\d{4})",
+    # OBACHT: Year is not accessable
+    r"^(?P<m>\d{2})-(?P<B>\w*)-(?P<d>\d{2})_(?P<f>\d{3})",
+    r"^(?P<Y>\d{4})_\[(?P<m>\d{2})_(?P<d>\d{2})\]",
+    r"^(?P<Y>\d{4})_\[(?P<m>\d{2})_(?P<d>\d{2})-\d{2}_\d{2}\]",
+    r"^\w{3}_\d{4}",
+    r"^\w{3}-(?P<Y>\d{4})(?P<m>\d{2})(?P<d>\d{2})-",
+]
+
+
+def combine_signatures(signatures: list[str]) -> tuple[re.Pattern, dict[str, list[str]]]:
+    """
+    Combine the signatures into one regex, such that one match call finds the first
+    matching signature. Each signature is a named group (s0, s1, ...) and its fields
+    are renamed to be unique (s0_Y, s0_m, ...).
+    Returns the regex and the date fields of each signature.
+    """
+    alternatives = []
+    fields = {}
+    for idx, signature in enumerate(signatures):
+        name = f"s{idx}"
+        alternatives.append(f"(?P<{name}>{signature.replace('(?P<', f'(?P<{name}_')})")
+        fields[name] = re.findall(r"\(\?P<(\w+)>", signature)
+    return re.compile("|".join(alternatives)), fields
+
+
+SIGNATURE_REGEX, SIGNATURE_FIELDS = combine_signatures(SIGNATURES)
+
+
+def match_signature(f_name: str) -> Union[dict[str, str], None]:
+    """
+    Returns the date fields of the first signature that matches the file name
+    or None if no signature matches.
+    """
+    if (match := SIGNATURE_REGEX.match(f_name)) is None:
+        return None
+    name = match.lastgroup
+    return {field: match.group(f"{name}_{field}") for field in SIGNATURE_FIELDS[name]}
@@ -1,29 +1,107 @@
 import datetime
 import os
 import re
-import shutil
-from os.path import isfile, join
-from tkinter import messagebox
-from typing import Any, Union
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join
+from typing import Any, Sequence, Union
 
 import piexif
-from database import Database
-from guiboxes.basebox import SEPARATOR
-from guiboxes.messagebox import MessageBox
-from guiboxes.selectionbox import SelectionBox
-from helper import test_time_frame_outside
+from artist_index import ArtistIndex
+from database import EVENT_E_DATE, EVENT_S_DATE, Database
+from date_parser import parse_exif_date, parse_fields
+from file_transfer import (
+    DEVICE_LIMITS,
+    case_insensitive,
+    copy_file,
+    copy_with_exif,
+    device_kind,
+    move_file,
+)
+from interaction import GuiInteraction, HeadlessInteraction
+from interval_index import IntervalIndex
+from journal import Journal
 from meta_information import MetaInformation
+from metadata import ImageMetadata, load_exif_dict, load_metadata
+from metadata_cache import MetadataCache
+from plan import PLAN_BATCH_SIZE, Operation, Plan
+from scanner import scan_tree_threaded
+from signatures import match_signature
 
 META = 1
 NAME = 2
+# Number of files that are read and analyzed ahead of their commit,
+# this limits the memory used by the metadata of the files
+ANALYSIS_WINDOW = 256
+
+
+class FileInfo:
+    """Collection of all information that is gathered for a file in the analysis phase."""
+
+    def __init__(self, f_name_cpl_old: str, src_dir: str):
+        """Setup the file information using the name and directory of the file."""
+        # Get name and extension of file
+        self.f_name_old, f_ext = os.path.splitext(f_name_cpl_old)
+        self.f_ext = f_ext.lower()
+        self.f_name_cpl_old = self.f_name_old + self.f_ext
+        self.src_dir = src_dir
+        # Exif metadata of .jpg files, parsed once and shared by all processing steps
+        self.meta: Union[ImageMetadata, None] = None
+
+        self.f_date: Union[datetime.datetime, None] = None
+        # Events that contain the date, searched for all files of a directory at once
+        self.events: Union[list[Sequence[Any]], None] = None
+        self.e_id = None
+        self.e_title = None
+        self.e_start = None
+        self.e_end = None
+        self.a_name = None
+        self.event_dir = "misc"
+        # Files that should not be moved or copied
+        self.skip = False
+
+
+class DeferredConflict(Exception):
+    """Raised in the analysis of a file that needs a user decision, while these are deferred."""
 
 
 class Sorter:
-    def __init__(self, meta_info: MetaInformation):
-        """Setup the Sorter Object"""
+    def __init__(
+        self,
+        meta_info: MetaInformation,
+        ui: Union[GuiInteraction, HeadlessInteraction, None] = None,
+    ):
+        """
+        Setup the Sorter Object. The user interaction (dialogs) can be given,
+        otherwise it is chosen depending on whether the meta information is headless.
+        """
         self.meta_info = meta_info
+        if ui is not None:
+            self.ui = ui
+        elif meta_info.headless:
+            self.ui = HeadlessInteraction(meta_info.text_queue)
+        else:
+            self.ui = GuiInteraction()
         self.confirm_fnum = False
         self.confirm_thumb = False
+        # Only one dialog should be shown at the same time
+        self.dialog_lock = threading.Lock()
+        # Persistent cache for the metadata of already processed files
+        self.cache: Union[MetadataCache, None] = None
+        # Names and number of files in each target directory, see get_dir_names
+        self.dir_names: dict[str, set[str]] = {}
+        self.dir_file_counts: dict[str, int] = {}
+        # Last number added to each taken file name of a directory
+        self.name_numbers: dict[tuple[str, str], int] = {}
+        # The names are compared ignoring the case, if the target file system does
+        self.ignore_case = False
+        # File operations that are not executed yet, see execute_plan
+        self.plan: Union[Plan, None] = None
+        # Journal of the completed operations, used to resume interrupted runs
+        self.journal: Union[Journal, None] = None
+        # Limits the parallel transfers to each device, see get_device_lock
+        self.device_locks: dict[int, threading.BoundedSemaphore] = {}
+        self.device_locks_lock = threading.Lock()
 
     ###############################################################################################
     # Main
@@ -32,198 +110,633 @@ class Sorter:
         """
         Main function, used for starting the sorting process.
         Setups the setting information and collects all files from the source directory.
-        Each file is then processed indiviudally using the process_file function.
+        Each file is analyzed (see analyze_files) and afterwards committed to the target
+        directory in order (see commit_file).
         """
         self.meta_info.text_queue.put("Start sorting\n")
 
-        # create database
-        self.db = Database()
         # List of raw files that were processed
         self.raw_list = []
+        self.dir_names = {}
+        self.dir_file_counts = {}
+        self.name_numbers = {}
+        self.device_locks = {}
+        self.read_settings()
+        # The file operations are planned first and executed afterwards for each directory,
+        # a dry run only saves the plan without modifying any file
+        self.plan = Plan()
+
+        source_dir = self.meta_info.img_src.get()
+        target_dir = self.meta_info.img_tgt.get()
+
+        if not os.path.exists(source_dir):
+            self.ui.show_error("Source path could not be found.")
+            self.meta_info.finished = True
+            return
+
+        self.ignore_case = case_insensitive(target_dir)
+
+        # The operations of an interrupted run are completed first, afterwards
+        # the files that were already processed are skipped
+        skipped = self.open_journal(source_dir, target_dir)
+
+        if self.use_cache > 0:
+            self.cache = MetadataCache(self.meta_info.cache_file.get())
+
+        # Load all events once, such that the lookups do not need to query the database
+        self.db = Database()
+        self.load_event_index()
+        self.db.close()
+
+        # The source directory (recursive if selected) is scanned in a separate thread,
+        # such that the processing starts with the first scanned directory.
+        # The number of files for the progressbar is updated while scanning.
+        self.meta_info.file_count_max = 0
+
+        def count_files(file_dir: str, entries: list[os.DirEntry]):
+            self.meta_info.file_count_max += len(entries)
+
+        try:
+            for file_dir, entries, empty in scan_tree_threaded(
+                source_dir, self.meta_info.recursive.get() == 1, count_files
+            ):
+                if empty:
+                    self.ui.show_error(f"Found empty folder: {file_dir}!")
+
+                # Sort file list so that the .jpg are in the front and getting processed first
+                entries.sort(key=lambda e: os.path.splitext(e.name)[1].lower() != ".jpg")
+                if skipped:
+                    entries = [e for e in entries if os.path.abspath(e.path) not in skipped]
+                self.set_filelist([e.name for e in entries], entries)
+
+                # Iterate the analyzed files in order and commit them to the target directory
+                for idx, info in enumerate(self.analyze_files(file_dir)):
+                    if self.filelist[idx] is None:
+                        assert self.process_samename > 0 or self.defer_conflicts > 0
+                        continue
+                    if info is None:
+                        self.defer_file(file_dir, idx)
+                        continue
+                    self.meta_info.file_count += self.commit_file(info, target_dir, idx)
+                    # The infos of the whole directory are kept, but not their metadata
+                    info.meta = None
+                    if len(self.plan) >= PLAN_BATCH_SIZE:
+                        self.flush_plan()
+
+                self.flush_plan()
+        except Exception as e:
+            # Stop the run, the journal is kept such that the run can be resumed
+            self.ui.show_error(f"Sorting stopped because of an error: {e}")
+            if self.cache is not None:
+                self.cache.close()
+                self.cache = None
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
+            self.meta_info.finished = True
+            raise
+
+        # Let the user decide for all files that were put aside
+        self.resolve_deferred(target_dir)
+        self.flush_plan()
+
+        if self.meta_info.file_count_max == 0:
+            self.ui.show_error("No files found! Select a different source path.")
+
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+
+        if self.dry_run:
+            plan_file = self.meta_info.plan_file.get()
+            try:
+                self.plan.save(plan_file)
+                self.meta_info.text_queue.put(
+                    f"Saved plan with {len(self.plan)} file operations to {plan_file}.\n"
+                )
+            except OSError:
+                self.ui.show_error(f"Saving the plan to {plan_file} failed!")
+        self.plan = None
+
+        # The run is completed, therefore it does not need to be resumed
+        if self.journal is not None:
+            self.journal.close(delete=True)
+            self.journal = None
 
-        # These variables are duplicates of the metadata vars.
-        # This is done to improve the performance since these get() functions can get expensive
-        # and should therefore not be called for each processed file
+        self.meta_info.text_queue.put("Finished sorting.\n")
+        self.meta_info.finished = True
+
+    def open_journal(self, source_dir: str, target_dir: str) -> set[str]:
+        """
+        Open the journal of the run, see journal.Journal. If the previous run with the same
+        directories was interrupted, its remaining operations are executed.
+        Returns the source files of the previous run that are already processed.
+        """
+        self.journal = None
+        if self.dry_run:
+            return set()
+
+        journal = Journal(self.meta_info.journal_file.get())
+        try:
+            resume = journal.open(source_dir, target_dir)
+        except FileExistsError:
+            # The interrupted run of the other directories can still be resumed
+            self.ui.show_error(
+                f"The journal {journal.path} belongs to an interrupted run of other directories, "
+                + "this run can not be resumed! Select another journal file or resume that run."
+            )
+            return set()
+        except OSError:
+            self.ui.show_error("Opening the journal failed, the run can not be resumed!")
+            return set()
+        self.journal = journal
+        if not resume:
+            return set()
+
+        skipped = journal.completed | {operation.src for operation in journal.pending}
+        self.meta_info.text_queue.put(
+            f"Resuming the interrupted run, {len(skipped)} files were already processed.\n"
+        )
+        self.execute_plan(Plan(journal.pending))
+        return skipped
+
+    def run_plan(self, plan_file: str):
+        """
+        Execute the plan of a previous dry run, see execute_plan.
+        The settings of the current run are used, except for the operations of the plan.
+        """
+        self.meta_info.text_queue.put(f"Start executing plan {plan_file}\n")
+
+        self.raw_list = []
+        self.dir_names = {}
+        self.dir_file_counts = {}
+        self.name_numbers = {}
+        self.device_locks = {}
+        self.read_settings()
+        self.plan = None
+        self.journal = None
+
+        try:
+            plan = Plan.load(plan_file)
+        except (OSError, ValueError) as e:
+            self.ui.show_error(f"Loading the plan {plan_file} failed: {e}")
+            self.meta_info.finished = True
+            return
+
+        self.meta_info.file_count_max = len(plan)
+        self.rename_taken_destinations(plan)
+        self.execute_plan(plan, update_progress=True)
+
+        # Thumbnails that were put aside while writing the metadata
+        self.resolve_deferred("")
+
+        self.meta_info.text_queue.put("Finished sorting.\n")
+        self.meta_info.finished = True
+
+    def rename_taken_destinations(self, plan: Plan):
+        """
+        The names of a saved plan were chosen for the target directories at the time of the
+        dry run. Destinations that are taken by now (e.g. by the files of another plan) get a
+        new name with a number (see get_numbered_name), such that no file is overwritten.
+        Operations with the same destination (files overwritten by the plan) keep sharing it.
+        """
+        if len(plan) == 0:
+            return
+        self.ignore_case = case_insensitive(os.path.dirname(plan.operations[0].dst))
+
+        # The new names must not be taken by other operations of the plan
+        for operation in plan.operations:
+            event_dir, name = os.path.split(operation.dst)
+            self.get_dir_names(event_dir).add(self.name_key(name))
+
+        renamed: dict[str, str] = {}
+        for operation in plan.operations:
+            if operation.dst not in renamed:
+                renamed[operation.dst] = operation.dst
+                if os.path.exists(operation.dst) and not self.is_own_result(operation):
+                    event_dir, name = os.path.split(operation.dst)
+                    new_name_ext = self.get_numbered_name(event_dir, *os.path.splitext(name))[1]
+                    self.get_dir_names(event_dir).add(self.name_key(new_name_ext))
+                    renamed[operation.dst] = join(event_dir, new_name_ext)
+                    self.meta_info.text_queue.put(
+                        f"File {operation.dst} already exists. "
+                        + f"New Name: {new_name_ext} for file: {operation.src}.\n"
+                    )
+            operation.dst = renamed[operation.dst]
+
+    def is_own_result(self, operation: Operation) -> bool:
+        """
+        Returns true if the existing destination is the result of the operation itself,
+        e.g. when a plan is executed again. Moved files do not exist at the source anymore,
+        copies keep the modification time of the source (or are links of it).
+        """
+        if operation.op == "move":
+            return not os.path.exists(operation.src)
+        try:
+            src_stat, dst_stat = os.stat(operation.src), os.stat(operation.dst)
+        except OSError:
+            return False
+        return os.path.samestat(src_stat, dst_stat) or src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+    def flush_plan(self):
+        """
+        Execute the operations planned so far, see execute_plan. A dry run only collects
+        the operations, which are saved at the end of the run.
+        """
+        if not self.dry_run:
+            self.execute_plan(self.plan)
+            self.plan = Plan()
+
+    def execute_plan(self, plan: Plan, update_progress: bool = False):
+        """
+        Execute all operations of the plan. First all destination directories are created,
+        each only once. Afterwards the files are transferred in a pool of I/O workers,
+        the number of parallel transfers to each device is limited (see get_device_lock).
+        Operations with the same destination, e.g. overwritten files, stay in order.
+        Failed transfers are reported afterwards, such that the I/O workers do not show dialogs.
+        """
+        if len(plan) == 0:
+            return
+
+        for directory in plan.directories():
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                self.ui.show_error(f"Creation of the directory {directory} failed!")
+
+        # The operations are saved before executing them, such that the run can be resumed
+        if self.journal is not None:
+            self.journal.plan(plan.operations)
+
+        groups: dict[str, list[Operation]] = {}
+        for operation in plan.operations:
+            groups.setdefault(operation.dst, []).append(operation)
+
+        failed: list[Operation] = []
+
+        def execute(operations: list[Operation]) -> int:
+            with self.get_device_lock(os.path.dirname(operations[0].dst)):
+                for operation in operations:
+                    if not self.execute_operation(operation):
+                        failed.append(operation)
+            return len(operations)
+
+        with ThreadPoolExecutor(max_workers=max(self.io_worker_count, 1)) as executor:
+            for count in executor.map(execute, groups.values()):
+                if update_progress:
+                    self.meta_info.file_count += count
+
+        for operation in failed:
+            self.ui.show_error(f"Movement of file {os.path.basename(operation.src)} failed")
+
+    def get_device_lock(self, directory: str) -> threading.BoundedSemaphore:
+        """
+        Returns the semaphore that limits the parallel transfers to the device of the
+        directory. The limit depends on the kind of device, see file_transfer.DEVICE_LIMITS,
+        devices without limit can use all I/O workers.
+        """
+        try:
+            dev = os.stat(directory).st_dev
+        except OSError:
+            dev = -1
+        with self.device_locks_lock:
+            if dev not in self.device_locks:
+                limit = DEVICE_LIMITS[device_kind(directory)] or self.io_worker_count
+                self.device_locks[dev] = threading.BoundedSemaphore(limit)
+            return self.device_locks[dev]
+
+    def execute_operation(self, operation: Operation) -> bool:
+        """
+        Execute a single operation of a plan and write its metadata if given.
+        The exif bytes are prepared before the transfer, for moved files they are inserted
+        afterwards. Only operations of a saved plan or journal need to load the metadata again.
+        Returns False if the transfer failed.
+        """
+        # The file can already be moved, if the run was interrupted afterwards
+        moved = (
+            operation.op == "move"
+            and not os.path.exists(operation.src)
+            and os.path.exists(operation.dst)
+        )
+
+        exif_bytes = operation.exif_bytes
+        if exif_bytes is None and operation.meta is not None:
+            meta = operation.meta
+            meta_fields = self.get_meta_fields(meta["title"], meta["artist"], meta["date"])
+            exif_bytes = self.get_exif_bytes(
+                operation.dst, meta_fields, None, operation.dst if moved else operation.src
+            )
+
+        if moved:
+            self.meta_info.text_queue.put(f"File {operation.dst} was already moved.\n")
+        elif not self.transfer_file(operation, exif_bytes):
+            return False
+
+        if operation.op == "move" and exif_bytes:
+            piexif.insert(exif_bytes, operation.dst)
+        if self.journal is not None:
+            self.journal.done(operation)
+        return True
+
+    def read_settings(self):
+        """
+        Read the settings of the current run.
+        These variables are duplicates of the metadata vars.
+        This is done to improve the performance since these get() functions can get expensive
+        and should therefore not be called for each processed file.
+        """
         self.copy_files = self.meta_info.copy_files.get()
+        self.link_mode = self.meta_info.link_mode.get()
+        self.copy_chunk_size = self.meta_info.copy_chunk_size
+        self.io_worker_count = self.meta_info.io_worker_count
+        self.dry_run = self.meta_info.dry_run.get() > 0
         self.process_unmatched = self.meta_info.process_unmatched.get()
         self.require_artist = self.meta_info.require_artist.get()
         self.process_samename = self.meta_info.process_samename.get()
         self.modify_meta = self.meta_info.modify_meta.get()
         self.overwrite_meta = self.meta_info.overwrite_meta.get()
+        self.worker_count = self.meta_info.worker_count.get()
+        self.use_cache = self.meta_info.use_cache.get()
+        self.defer_conflicts = self.meta_info.defer_conflicts.get()
+        # Files and thumbnails that need a user decision, these are processed at the end
+        self.deferred_files: list[tuple[str, list[str]]] = []
+        self.deferred_thumbs: list[tuple[str, list[dict[str, Any]]]] = []
 
         self.in_signature = self.meta_info.in_signature.get()
         self.file_signature = self.meta_info.file_signature.get()
         self.folder_signature = self.meta_info.folder_signature.get()
 
-        source_dir = self.meta_info.img_src.get()
-        target_dir = self.meta_info.img_tgt.get()
-
-        if not os.path.exists(source_dir):
-            messagebox.showinfo(message="Source path could not be found.", title="Error")
-            self.meta_info.finished = True
+    def analyze_files(self, src_dir: str):
+        """
+        Generator that yields the analysis result for each file of the current filelist.
+        The files are processed in windows of ANALYSIS_WINDOW files. First the metadata and
+        dates of the files are read, such that the events of all dates can be searched at once
+        (see assign_events). Afterwards the files are analyzed one after another, with multiple
+        workers this runs in a thread pool, while the results are still returned in the order
+        of the filelist. This keeps the commit phase and therefore the generated file names
+        deterministic.
+        """
+        # Files that will likely be processed together with a file of the same name
+        # are not analyzed ahead of time, this is done lazily if they are still needed.
+        lazy = set()
+        if self.process_samename > 0 and self.file_signature != "Foldername_Number":
+            for group in self.samename_groups.values():
+                lazy.update(idx for idx in group[1:] if self.file_exts[idx] != ".jpg")
+
+        def read(idx: int) -> Union[FileInfo, None]:
+            # Files of earlier windows can already have processed the file
+            if idx in lazy or self.filelist[idx] is None:
+                return None
+            return self.read_file(self.filelist[idx], src_dir)
+
+        windows = [
+            range(start, min(start + ANALYSIS_WINDOW, len(self.filelist)))
+            for start in range(0, len(self.filelist), ANALYSIS_WINDOW)
+        ]
+
+        if self.worker_count < 2:
+            for window in windows:
+                infos = [read(idx) for idx in window]
+                self.assign_events(infos)
+                for idx, info in zip(window, infos):
+                    if (file := self.filelist[idx]) is not None:
+                        yield self.try_analyze_file(file, src_dir, info)
+                    else:
+                        yield None
             return
 
-        # If only the root directory should be processed
-        file_dirs = [source_dir]
-        file_counts = len([1 for f in os.listdir(source_dir) if isfile(join(source_dir, f))])
-        # Overwrite if the folder should be processed recursive
-        if self.meta_info.recursive.get() == 1:
-            dir_info = [(len(files), cur_path) for cur_path, d, files in os.walk(source_dir)]
-            file_counts, file_dirs = zip(*dir_info)
-            file_counts = sum(file_counts)
-
-        # Update the progressbar and label for the files
-        self.meta_info.file_count_max = file_counts
-
-        if file_counts == 0:
-            messagebox.showinfo(
-                message="No files found! Select a different source path.", title="Error"
-            )
-            self.meta_info.finished = True
+        with ThreadPoolExecutor(max_workers=self.worker_count) as executor:
+            for window in windows:
+                infos = list(executor.map(read, window))
+                self.assign_events(infos)
+                futures = [
+                    None
+                    if info is None
+                    else executor.submit(self.try_analyze_file, info.f_name_cpl_old, src_dir, info)
+                    for info in infos
+                ]
+                for idx, future in zip(window, futures):
+                    if future is not None:
+                        yield future.result()
+                    elif self.filelist[idx] is not None:
+                        yield self.try_analyze_file(self.filelist[idx], src_dir)
+                    else:
+                        yield None
+
+    def assign_events(self, infos: list[Union[FileInfo, None]]):
+        """
+        Search the events for the dates of all given files at once (see
+        IntervalIndex.get_by_dates), the events are used by get_event_by_date.
+        """
+        dated = [info for info in infos if info is not None and info.f_date is not None]
+        events = self.event_index.get_by_dates([info.f_date for info in dated])
+        for info, info_events in zip(dated, events):
+            info.events = info_events
+
+    def try_analyze_file(
+        self, f_name_cpl_old: str, src_dir: str, info: Union[FileInfo, None] = None
+    ) -> Union[FileInfo, None]:
+        """Analyze the file, returns None if the file needs a user decision that is deferred."""
+        try:
+            return self.analyze_file(f_name_cpl_old, src_dir, info)
+        except DeferredConflict:
+            return None
+
+    def defer_file(self, src_dir: str, file_idx: int):
+        """
+        Put the file of the filelist aside, such that it is processed at the end of the run.
+        Files with the same name are put aside with it, since they are processed together.
+        """
+        files = [self.filelist[file_idx]]
+        if self.process_samename > 0 and self.file_signature != "Foldername_Number":
+            f_name, f_ext = os.path.splitext(files[0].lower())
+            for idx, file in self.get_samename_files(f_name, f_ext, file_idx):
+                files.append(file)
+                self.filelist[idx] = None
+
+        self.meta_info.text_queue.put(f"Deferred file {files[0]} until the end of the run.\n")
+        self.deferred_files.append((src_dir, files))
+
+    def resolve_deferred(self, tgt_dir: str):
+        """
+        Process the files that were put aside, since they need a user decision.
+        For this the dialogs are shown one after another for all of these files.
+        """
+        if len(self.deferred_files) == 0 and len(self.deferred_thumbs) == 0:
             return
 
-        for file_dir in file_dirs:
-            # Get all files in the directory
-            self.filelist = [f for f in os.listdir(file_dir) if isfile(join(file_dir, f))]
+        self.meta_info.text_queue.put(
+            f"Resolving {len(self.deferred_files) + len(self.deferred_thumbs)} deferred files.\n"
+        )
+        self.defer_conflicts = 0
 
-            if len(os.listdir(file_dir)) == 0:
-                messagebox.showinfo(message=f"Found empty folder: {file_dir}!", title="Error")
+        for src_dir, files in self.deferred_files:
+            # The filelist only contains the file and its same name files
+            self.set_filelist(files)
+            info = self.analyze_file(files[0], src_dir)
+            self.meta_info.file_count += self.commit_file(info, tgt_dir, 0)
+            if len(self.plan) >= PLAN_BATCH_SIZE:
+                self.flush_plan()
 
-            # Sort file list so that the .jpg are in the front and getting processed first
-            self.filelist.sort(key=lambda f: os.path.splitext(f)[1].lower() != ".jpg")
+        for file_with_path, meta_fields in self.deferred_thumbs:
+            self.modify_metadata_piexif(file_with_path, meta_fields)
 
-            # Iterate the files
-            for idx, file in enumerate(self.filelist):
-                if file is None:
-                    assert self.process_samename > 0
-                    continue
-                self.meta_info.file_count += self.process_file(file, file_dir, target_dir, idx)
+        self.deferred_files = []
+        self.deferred_thumbs = []
 
-        self.meta_info.text_queue.put("Finished sorting.\n")
-        self.meta_info.finished = True
+    def defer_conflict(self, f_name: str):
+        """Put the file aside instead of asking the user, if conflicts are deferred."""
+        if self.defer_conflicts > 0:
+            raise DeferredConflict(f_name)
 
-    def process_file(self, f_name_cpl_old: str, src_dir: str, tgt_dir: str, file_idx: int):
+    def read_file(self, f_name_cpl_old: str, src_dir: str) -> FileInfo:
+        """
+        Read the metadata of the file and parse its date from either metadata or file name.
+        This is the first step of the analysis, see analyze_file.
         """
-        This function processes the given file to either be moved or copied
-        to a folder that is created using the information given by the file name or metadata.
+        info = FileInfo(f_name_cpl_old, src_dir)
+
+        # Parse the metadata only once, since it is needed for the date and the artist
+        if info.f_ext == ".jpg":
+            info.meta = self.get_img_metadata(src_dir, info.f_name_cpl_old)
+
+        info.f_date = self.get_img_date(src_dir, info.f_name_cpl_old, info.f_ext, info.meta)
+        return info
+
+    def analyze_file(
+        self, f_name_cpl_old: str, src_dir: str, info: Union[FileInfo, None] = None
+    ) -> FileInfo:
+        """
+        Analysis phase of the file processing, which does not modify any files
+        and can therefore run in parallel for multiple files.
         For this the date of the file is extracted by either parsing the filename or
         using the metadata. In case no date could be extracted the file is moved/copied
         to a misc folder. Otherwise the date is used to query the database for an event.
         Should the file be a .jpg the metadata is used to obtain information of the artist.
         With the date and artist information the event might be determined.
         Following this a subevent might also be obtained.
-        Finally the new filename is generated, the folder are created and the file is moved.
-        At the end the artist information is saved in the metadata if possible.
+
+        If the file was already read (see read_file) the given info is used.
 
         Obacht: Some features can be disabled via the GUI.
         """
-        count = 1
-        event_dir = "misc"
-        e_id = None
-        e_title = None
-        e_start = None
-        e_end = None
-        a_name2 = None
-
-        # Get name and extension of file
-        f_name_old, f_ext = os.path.splitext(f_name_cpl_old)
-        f_ext = f_ext.lower()
-        f_name_cpl_old = f_name_old + f_ext
-
-        # Parse date from either metadata or file name
-        f_date = self.get_img_date(src_dir, f_name_cpl_old, f_ext)
+        if info is None:
+            info = self.read_file(f_name_cpl_old, src_dir)
 
         # Optional TODO: Add support for other metadata like .mp4 exif
         ###########################################################################################
         # Process files with date information
         ###########################################################################################
         # If a date was parseable try to get an event with it
-        if f_date is not None:
+        if info.f_date is not None:
             ##################
             # JPG processing #
             ##################
-            if f_ext == ".jpg":
+            if info.f_ext == ".jpg":
                 # Get all available file information from metadata
-                a_name1, a_make, a_model = self.get_img_artist(src_dir, f_name_cpl_old)
+                a_name1, a_make, a_model = self.get_img_artist(
+                    src_dir, info.f_name_cpl_old, info.meta
+                )
                 # Afterwards get event data
                 # Also returns possible author name and image date with applied shift
-                if result_e := self.get_event_by_artist(f_name_cpl_old, f_date, a_make, a_model):
-                    e_id, e_title, e_start, e_end, a_name2, f_date = result_e
+                if result_e := self.get_event_by_artist(
+                    info.f_name_cpl_old, info.f_date, a_make, a_model
+                ):
+                    info.e_id, info.e_title, info.e_start, info.e_end = result_e[0:4]
+                    info.a_name, info.f_date = result_e[4:6]
 
                     # Check that the artist did not change
-                    if a_name1 and a_name1 != a_name2:
-                        box = SelectionBox(
-                            title="Warning: Artist names differ!",
-                            message=(
-                                "The artist name in the metadata did "
-                                + "not match the artist name of the event."
-                            ),
-                            actioncall="Select artist:",
-                            options=[a_name1, a_name2],
-                        )
+                    if a_name1 and a_name1 != info.a_name:
+                        self.defer_conflict(info.f_name_cpl_old)
+                        with self.dialog_lock:
+                            select = self.ui.select(
+                                title="Warning: Artist names differ!",
+                                message=(
+                                    "The artist name in the metadata did "
+                                    + "not match the artist name of the event."
+                                ),
+                                actioncall="Select artist:",
+                                options=[(a_name1,), (info.a_name,)],
+                                # Without a user the file keeps its event
+                                default=1,
+                            )
                         # Userselection: Discard event information like title and name
-                        if box.choice.get() == a_name1:
-                            e_title = None
-                            a_name2 = a_name1
+                        if select == 0:
+                            info.e_title = None
+                            info.a_name = a_name1
                 # If it was not possible to get an event via the artist use the date
                 else:
-                    e_id, e_title, e_start, e_end = self.get_event_by_date(f_name_cpl_old, f_date)
+                    result_e = self.get_event_by_date(
+                        info.f_name_cpl_old, info.f_date, info.events
+                    )
+                    info.e_id, info.e_title, info.e_start, info.e_end = result_e
 
             ######################
             # Non JPG processing #
             ######################
             # If the file is not a .jpg use the date to extract the event
             else:
-                e_id, e_title, e_start, e_end = self.get_event_by_date(f_name_cpl_old, f_date)
+                result_e = self.get_event_by_date(info.f_name_cpl_old, info.f_date, info.events)
+                info.e_id, info.e_title, info.e_start, info.e_end = result_e
 
-            ########################################
-            # Subevent search and folder creationg #
-            ########################################
+            ##################
+            # Subevent search #
+            ##################
             # If an event was found search for a matching subevent and overwrite data accordingly
-            if e_id and e_title:
-                if result_se := self.get_subevent_by_dateid(f_date, e_id):
-                    e_title += f" - {result_se[0]}"
-                    e_start, e_end = result_se[1:3]
-
-            # Create year folder
-            self.create_folder(tgt_dir, str(f_date.year))
-            tgt_dir = join(tgt_dir, str(f_date.year))
+            if info.e_id and info.e_title:
+                if result_se := self.get_subevent_by_dateid(info.f_date, info.e_id):
+                    info.e_title += f" - {result_se[0]}"
+                    info.e_start, info.e_end = result_se[1:3]
 
             # Overwrite event_dir if there is one
-            if e_title and e_start and e_end:
-                event_dir = self.get_new_foldername(e_title, e_start, e_end)
+            if info.e_title and info.e_start and info.e_end:
+                info.event_dir = self.get_new_foldername(info.e_title, info.e_start, info.e_end)
             # Otherwise the file is ignored or moved into a misc folder inside the year directory
             else:
                 # TODO dopplung with get_evet_by_artist
                 self.meta_info.text_queue.put(
-                    f"No matching event found for file: {f_name_cpl_old}.\n"
+                    f"No matching event found for file: {info.f_name_cpl_old}.\n"
                 )
                 # Do not process file when GUI option is deselected
-                if self.process_unmatched == 0:
-                    self.meta_info.text_queue.put("Did not move or copy file!\n")
-                    return count
+                info.skip = self.process_unmatched == 0
         ###########################################################################################
         # Process files without date information
         ###########################################################################################
         else:
-            self.meta_info.text_queue.put(f"Found incompatible file: {f_name_cpl_old}.\n")
+            self.meta_info.text_queue.put(f"Found incompatible file: {info.f_name_cpl_old}.\n")
             # Do not process file when GUI option is deselected
-            if self.process_unmatched == 0:
-                self.meta_info.text_queue.put("Did not move or copy file!\n")
-                return count
+            info.skip = self.process_unmatched == 0
+
+        return info
+
+    def commit_file(self, info: "FileInfo", tgt_dir: str, file_idx: int):
+        """
+        Commit phase of the file processing, which needs to run in the order of the filelist.
+        The new filename is generated, the folder are created and the file is moved.
+        At the end the artist information is saved in the metadata if possible.
+        """
+        count = 1
+        src_dir = info.src_dir
+        event_dir = info.event_dir
+        f_date = info.f_date
+        f_ext = info.f_ext
+        f_name_cpl_old = info.f_name_cpl_old
+
+        # Year folder, the folders are created when executing the plan
+        if f_date is not None:
+            tgt_dir = join(tgt_dir, str(f_date.year))
+
+        if info.skip:
+            self.meta_info.text_queue.put("Did not move or copy file!\n")
+            return count
 
         ###########################################################################################
         # Finalization
         ###########################################################################################
-        # Create event folder
-        self.create_folder(tgt_dir, event_dir)
-
         # Do not process file when GUI option is deselected
-        if self.require_artist > 0 and event_dir != "misc" and a_name2 is None:
+        if self.require_artist > 0 and event_dir != "misc" and info.a_name is None:
             tgt_dir = join(tgt_dir, event_dir)
             event_dir = "no_artist"
-            # Create event folder
-            self.create_folder(tgt_dir, event_dir)
 
         # Parse the date to get the new file name. The output pattern is specified using the GUI.
         if f_date is not None:
@@ -231,54 +744,115 @@ class Sorter:
                 join(tgt_dir, event_dir), f_date, f_ext
             )
         else:
-            f_name_new, f_name_cpl_new = f_name_old, f_name_cpl_old
+            f_name_new, f_name_cpl_new = info.f_name_old, f_name_cpl_old
+
+        tgt_dir = join(tgt_dir, event_dir)
+
+        ###################
+        # Modify metadata #
+        ###################
+        # Only modifies the file in the new folder not the original.
+        # When copying the new metadata is written while copying the file,
+        # moved files are modified afterwards (see execute_operation).
+        # A dry run only records the metadata in the plan, which is written when executing it.
+        modify_meta = self.modify_meta > 0 and f_ext == ".jpg"
+        exif_bytes = None
+        meta = None
+        if modify_meta:
+            meta = {"title": info.e_title, "artist": info.a_name, "date": f_date}
+        if modify_meta and not self.dry_run:
+            meta_fields = self.get_meta_fields(info.e_title, info.a_name, f_date)
+            # The new file has the same metadata as the original, therefore it can be reused.
+            # Metadata from the cache does not contain the exif dict, only the exif segment
+            # is read again (see metadata.load_exif_dict).
+            exif_dict = info.meta.exif_dict if info.meta else None
+            exif_bytes = self.get_exif_bytes(
+                join(tgt_dir, f_name_cpl_new),
+                meta_fields,
+                exif_dict,
+                join(src_dir, f_name_cpl_old),
+            )
+            # The metadata is not modified, this is also saved in the journal
+            if exif_bytes is None:
+                meta = None
 
         #####################
         # Move or copy file #
         #####################
-        tgt_dir = join(tgt_dir, event_dir)
-        self.move_or_copy_image(tgt_dir, src_dir, f_name_cpl_old, f_name_cpl_new)
+        self.move_or_copy_image(tgt_dir, src_dir, f_name_cpl_old, f_name_cpl_new, exif_bytes, meta)
 
         ####################################
         # Move or copy similar named files #
         ####################################
         if self.process_samename > 0 and self.file_signature != "Foldername_Number":
-            # Iterate the files in the same directory
-            for idx, file in enumerate(self.filelist[file_idx + 1 :]):
-                if file is None:
-                    continue
-                # Extract file ending
-                tmp_name, tmp_ext = os.path.splitext(file.lower())
-                # If the file has the same name but is a different file and is not a .jpg
-                if tmp_name == f_name_old.lower() and tmp_ext != ".jpg" and tmp_ext != f_ext:
-                    count += 1
-                    self.move_or_copy_image(tgt_dir, src_dir, file, f_name_new + tmp_ext)
-                    self.filelist[file_idx + idx + 1] = None
+            for idx, file in self.get_samename_files(info.f_name_old.lower(), f_ext, file_idx):
+                count += 1
+                self.move_or_copy_image(tgt_dir, src_dir, file, f_name_new + self.file_exts[idx])
+                self.filelist[idx] = None
 
         assert not (self.process_samename == 1 and self.file_signature == "Foldername_Number")
 
-        ###################
-        # Modify metadata #
-        ###################
-        # Only modifies the file in the new folder not the original
-        if self.modify_meta > 0 and f_ext == ".jpg":
-            meta_fields = [
-                {"dict": "0th", "key": piexif.ImageIFD.ImageDescription, "value": e_title},
-                {"dict": "0th", "key": piexif.ImageIFD.Artist, "value": a_name2},
-                {"dict": "Exif", "key": piexif.ExifIFD.DateTimeOriginal, "value": f_date},
-            ]
-            self.modify_metadata_piexif(join(tgt_dir, f_name_cpl_new), meta_fields)
-
         return count
 
+    def set_filelist(self, filelist: list[str], entries: Union[list[os.DirEntry], None] = None):
+        """
+        Set the list of files that are processed next. The files are grouped by their
+        lower case name once, such that files with the same name are found without
+        searching the list again for each file.
+        If given the directory entries of the files are used for their stat information.
+        """
+        self.filelist = filelist
+        self.file_entries = {e.name: e for e in entries} if entries else {}
+        # Lower case extension of each file
+        self.file_exts: list[str] = []
+        # Indices of the files with the same lower case name, in the order of the filelist
+        self.samename_groups: dict[str, list[int]] = {}
+        for idx, file in enumerate(filelist):
+            tmp_name, tmp_ext = os.path.splitext(file.lower())
+            self.file_exts.append(tmp_ext)
+            self.samename_groups.setdefault(tmp_name, []).append(idx)
+
+    def get_samename_files(self, f_name: str, f_ext: str, file_idx: int) -> list[tuple[int, str]]:
+        """
+        Returns the index and name of all files after the given index in the filelist,
+        that have the same (lower case) name but are a different file and not a .jpg.
+        """
+        result = []
+        for idx in self.samename_groups.get(f_name, []):
+            if idx <= file_idx or self.filelist[idx] is None:
+                continue
+            if self.file_exts[idx] != ".jpg" and self.file_exts[idx] != f_ext:
+                result.append((idx, self.filelist[idx]))
+        return result
+
+    def load_event_index(self):
+        """Load the events, subevents and artists from the database into in-memory indices."""
+        self.event_index = IntervalIndex(self.db.get_all("events"), EVENT_S_DATE, EVENT_E_DATE)
+
+        # There are only few subevents for each event, therefore they are grouped by event
+        # Order: se_id, e_id, se_title, se_start, se_end
+        self.subevents_by_event: dict[int, list[tuple]] = {}
+        for subevent in self.db.get_all("subevents"):
+            self.subevents_by_event.setdefault(subevent[1], []).append(subevent)
+
+        self.artist_index = ArtistIndex(
+            self.db.get_all("artists"), self.db.get_all("participants"), self.db.get_all("persons")
+        )
+
     def get_event_by_date(
-        self, f_name_cpl_old: str, date: datetime.datetime
+        self,
+        f_name_cpl_old: str,
+        date: datetime.datetime,
+        events: Union[list[Sequence[Any]], None] = None,
     ) -> Union[
         tuple[int, str, datetime.datetime, datetime.datetime], tuple[None, None, None, None]
     ]:
-        """If present returns event information as a tuple for the given date."""
+        """
+        If present returns event information as a tuple for the given date.
+        If the events of the date were already searched (see assign_events) they are used.
+        """
         # Get a list of all events using the given date
-        lst_events = self.db.get_by_date("events", date)
+        lst_events = events if events is not None else self.event_index.get_by_date(date)
 
         if len(lst_events) == 0:
             return (None, None, None, None)
@@ -287,13 +861,14 @@ class Sorter:
         # Let the user select the event if more than one matched.
         # Do not process .jpg's
         if len(lst_events) > 1:
-            box = SelectionBox(
-                title="Warning: Multiple events match!",
-                message=f"The given file ({f_name_cpl_old}) matches multiple events.",
-                actioncall="Select event:",
-                options=[f"{i}{SEPARATOR}{e[1]}" for i, e in enumerate(lst_events)],
-            )
-            select = int(box.choice.get().split(SEPARATOR)[0])
+            self.defer_conflict(f_name_cpl_old)
+            with self.dialog_lock:
+                select = self.ui.select(
+                    title="Warning: Multiple events match!",
+                    message=f"The given file ({f_name_cpl_old}) matches multiple events.",
+                    actioncall="Select event:",
+                    options=[(e[1],) for e in lst_events],
+                )
 
         # Order: e_id, e_title, e_start, e_end
         return lst_events[select][0:4]
@@ -304,7 +879,9 @@ class Sorter:
     ) -> Union[None, tuple[str, datetime.datetime, datetime.datetime]]:
         """If present returns subevent information as a tuple for the given date and event id."""
         # There can only be one subevent so there is no need to manually select it
-        lst_subevent = self.db.get_by_date("subevents", date, ("event_id", e_id))
+        lst_subevent = [
+            se for se in self.subevents_by_event.get(e_id, []) if se[3] <= date and se[4] >= date
+        ]
         assert len(lst_subevent) < 2
 
         # Overwrite result if subevent exists
@@ -334,49 +911,14 @@ class Sorter:
         ########################
         # Get possible artists #
         ########################
-        # List all artists, that used the right camera
-        lst_artists = self.db.get("artists", ("make", make), ("model", model))
-        # If there was no matching artist found, print error
-        if len(lst_artists) < 1:
+        # If there was no artist using the right camera, print error
+        if not self.artist_index.has_artist(make, model):
             self.meta_info.text_queue.put(f"No matching artist found for file: {filename}.\n")
             return None
 
-        lst_final = []
-        for artist in lst_artists:
-            shift = artist[6].split(":")
-            date_shift = datetime.timedelta(
-                days=int(shift[0]),
-                hours=int(shift[1]),
-                minutes=int(shift[2]),
-                seconds=int(shift[3]),
-            )
-            # Shift the image date
-            shifted_date = date + date_shift
-            # Check if this artist matches the time frame itselft -> s_date, e_date
-            if test_time_frame_outside(artist[4], artist[5], shifted_date, shifted_date):
-                continue
-
-            # Get a list of all events using the shifted date of this artist
-            lst_events = self.db.get_by_date("events", shifted_date)
-
-            # Finally the artist and event list are cross
-            # referenced to reduce the pool of candidates.
-            for event in lst_events:
-                # Get all participants for the tested event
-                # Optional TODO: might be possible to use a database join here
-                lst_parts = self.db.get("participants", ("event_id", event[0]))
-
-                for p in lst_parts:
-                    # Check if pid of participant matches with the current artist
-                    # Use person id for both
-                    if p[1] == artist[1]:
-                        # Check that the participation timeframe matches the image date
-                        # -> p_s_date, p_e_date
-                        if test_time_frame_outside(p[3], p[4], shifted_date, shifted_date):
-                            continue
-
-                        name = self.db.get_pname(p[1])
-                        lst_final.append((event, name, shifted_date))
+        # The artists are cross referenced with the events and their participants
+        # to reduce the pool of candidates. Order: event, name, shifted_date
+        lst_final = self.artist_index.match(date, make, model, self.event_index)
 
         # If there was no matching event and artist combo found print error
         if len(lst_final) < 1:
@@ -391,15 +933,16 @@ class Sorter:
         if len(lst_final) > 1:
             self.meta_info.text_queue.put(f"To many matching events found for file: {filename}.\n")
 
-            box = SelectionBox(
-                title="Warning: Multiple events/artists match!",
-                message=f"The given file ({filename}) matches multiple event-artist combinations.",
-                actioncall="Select the correct combination:",
-                options=[
-                    f"{i}{SEPARATOR}{e[0][1]}{SEPARATOR}{e[1]}" for i, e in enumerate(lst_final)
-                ],
-            )
-            select = int(box.choice.get().split(SEPARATOR)[0])
+            self.defer_conflict(filename)
+            with self.dialog_lock:
+                select = self.ui.select(
+                    title="Warning: Multiple events/artists match!",
+                    message=(
+                        f"The given file ({filename}) matches multiple event-artist combinations."
+                    ),
+                    actioncall="Select the correct combination:",
+                    options=[(e[0][1], e[1]) for e in lst_final],
+                )
 
         return (
             lst_final[select][0][0],  # e_id
@@ -410,19 +953,6 @@ class Sorter:
             lst_final[select][2],  # date
         )
 
-    def create_folder(self, tgt_dir: str, folder_name: str):
-        """Create the given folder in the target directory."""
-        res_dir = join(tgt_dir, folder_name)
-        # Check if the folder already exists
-        try:
-            if not os.path.exists(res_dir):
-                os.mkdir(res_dir)
-        except OSError:
-            messagebox.showinfo(
-                message=f"Creation of the directory {res_dir} failed!", title="Error"
-            )
-        return res_dir
-
     def get_file_name(self, event_dir: str, f_date: datetime.datetime, f_ext: str):
         """Returns the new filename with and without file extension."""
         assert event_dir
@@ -433,70 +963,167 @@ class Sorter:
         new_name_ext = new_name + f_ext
 
         # Check if the file already exists
-        if os.path.exists(os.path.join(event_dir, new_name_ext)):
+        names = self.get_dir_names(event_dir)
+        if self.name_key(new_name_ext) in names:
+            overwrite = self.confirm_fnum
             if not self.meta_info.dont_ask_again_fnum.get():
-                box = MessageBox(
-                    title="Warning: Filename already taken!",
-                    msg="Overwrite file? Adding number to name otherwise.",
-                    again=self.meta_info.dont_ask_again_fnum,
-                )
-                self.confirm_fnum = box.choice
+                # Without asking the user no file is overwritten
+                if self.defer_conflicts > 0:
+                    overwrite = False
+                else:
+                    with self.dialog_lock:
+                        self.confirm_fnum = self.ui.ask(
+                            title="Warning: Filename already taken!",
+                            msg="Overwrite file? Adding number to name otherwise.",
+                            again=self.meta_info.dont_ask_again_fnum,
+                        )
+                    overwrite = self.confirm_fnum
             # If the user selected "do not override" add number
-            if not self.confirm_fnum:
-                i = 1
-                new_name_ext = f"{new_name}_{i}{f_ext}"
-                while os.path.exists(os.path.join(event_dir, new_name_ext)):
-                    i += 1
-                    new_name_ext = f"{new_name}_{i}{f_ext}"
-                new_name = f"{new_name}_{i}"
+            if not overwrite:
+                return self.get_numbered_name(event_dir, new_name, f_ext)
 
         return (new_name, new_name_ext)
 
+    def get_numbered_name(self, event_dir: str, new_name: str, f_ext: str):
+        """
+        Returns the first free filename of the directory with a number added to the given name,
+        with and without file extension.
+        """
+        names = self.get_dir_names(event_dir)
+        # Continue with the last number used for this name
+        key = (os.path.normpath(event_dir), self.name_key(new_name + f_ext))
+        i = self.name_numbers.get(key, 1)
+        while self.name_key(f"{new_name}_{i}{f_ext}") in names:
+            i += 1
+        self.name_numbers[key] = i
+        return (f"{new_name}_{i}", f"{new_name}_{i}{f_ext}")
+
     def move_or_copy_image(
-        self, event_dir: str, src_dir: str, name_cpl_old: str, name_cpl_new: str
+        self,
+        event_dir: str,
+        src_dir: str,
+        name_cpl_old: str,
+        name_cpl_new: str,
+        exif_bytes: Union[bytes, None] = None,
+        meta: Union[dict[str, Any], None] = None,
     ):
-        """Depending on the settings move or copy the given file with the new filename."""
-        assert isfile(join(src_dir, name_cpl_old))
+        """
+        Depending on the settings plan to move or copy the given file with the new filename.
+        The operation is executed with the other operations of the plan, see execute_plan.
+        The metadata is saved with the operation, such that it can be written again
+        when executing a saved plan or resuming an interrupted run.
+        """
+        operation = Operation(
+            "copy" if self.copy_files > 0 else "move",
+            os.path.abspath(join(src_dir, name_cpl_old)),
+            os.path.abspath(join(event_dir, name_cpl_new)),
+            meta,
+            exif_bytes,
+        )
+        self.plan.add(operation)
+        if self.dry_run:
+            self.meta_info.text_queue.put(
+                f"Planned to {operation.op} file: {name_cpl_old} with name: {name_cpl_new}.\n"
+            )
+
+        # Register the new file, overwritten files do not change the number of files
+        directory = os.path.normpath(event_dir)
+        name_key = self.name_key(name_cpl_new)
+        if directory in self.dir_names and name_key not in self.dir_names[directory]:
+            self.dir_names[directory].add(name_key)
+            self.dir_file_counts[directory] += 1
+
+    def transfer_file(self, operation: Operation, exif_bytes: Union[bytes, None] = None) -> bool:
+        """
+        Execute the given file operation.
+        On the same device copies can be links, see file_transfer.copy_file.
+        If exif bytes are given the copy gets these as metadata, see file_transfer.copy_with_exif.
+        Returns False if the operation failed, the error is shown by execute_plan.
+        """
+        name_cpl_old = os.path.basename(operation.src)
+        name_cpl_new = os.path.basename(operation.dst)
         try:
-            if self.copy_files > 0:
+            if operation.op == "copy":
                 # Copy file
-                shutil.copy2(join(src_dir, name_cpl_old), join(event_dir, name_cpl_new))
+                method = self.copy_image(operation.src, operation.dst, exif_bytes)
+                linked = f" ({method})" if method != "copy" else ""
                 self.meta_info.text_queue.put(
-                    f"Copied file: {name_cpl_old} with name: {name_cpl_new}.\n"
+                    f"Copied file: {name_cpl_old} with name: {name_cpl_new}{linked}.\n"
                 )
             else:
                 # Move file to the correct folder
-                shutil.move(join(src_dir, name_cpl_old), join(event_dir, name_cpl_new))
+                move_file(operation.src, operation.dst, self.copy_chunk_size)
                 self.meta_info.text_queue.put(
                     f"Moved file: {name_cpl_old}. New Name: {name_cpl_new}.\n"
                 )
         except OSError:
-            messagebox.showinfo(message=f"Movement of file {name_cpl_old} failed", title="Error")
+            return False
+        return True
+
+    def copy_image(self, src: str, dst: str, exif_bytes: Union[bytes, None] = None) -> str:
+        """
+        Copy the given file, if exif bytes are given they are written while copying.
+        Otherwise the file can be linked depending on the settings.
+        Returns the method that was used, see file_transfer.copy_file.
+        """
+        if exif_bytes is not None:
+            try:
+                copy_with_exif(src, dst, exif_bytes, self.copy_chunk_size)
+                return "copy"
+            except ValueError:
+                self.meta_info.text_queue.put(f"File {src} could not modify metadata.\n")
+
+        # A hardlink shares the metadata with the original, which must stay unchanged
+        link_mode = self.link_mode
+        if link_mode == "Hardlink" and self.modify_meta > 0:
+            if os.path.splitext(dst)[1].lower() == ".jpg":
+                link_mode = "Copy"
+        return copy_file(src, dst, link_mode, self.copy_chunk_size)
 
-    def get_img_artist(self, src_dir: str, f_name: str):
-        """Collect and return the image artist information."""
+    def get_img_metadata(self, src_dir: str, f_name: str):
+        """
+        Parse and return the exif metadata of the given .jpg file.
+        If enabled the metadata cache is used to skip files that did not change.
+        """
         assert f_name.endswith(".jpg")
+        file_with_path = os.path.abspath(join(src_dir, f_name))
         try:
-            exif_dict = piexif.load(join(src_dir, f_name))
-            # If present get the artist from metadata
-            a_name = self.get_exif_value(exif_dict, "0th", piexif.ImageIFD.Artist)
-            # Get make and model from metadata
-            a_make = self.get_exif_value(exif_dict, "0th", piexif.ImageIFD.Make)
-            a_model = self.get_exif_value(exif_dict, "0th", piexif.ImageIFD.Model)
-            return a_name, a_make, a_model
+            if self.cache is None:
+                return load_metadata(file_with_path)
+
+            # Use the stat information cached by the scan of the directory
+            entry = self.file_entries.get(f_name)
+            stat = entry.stat() if entry is not None else os.stat(file_with_path)
+            if meta := self.cache.get(file_with_path, stat.st_size, stat.st_mtime_ns):
+                return meta
+            meta = load_metadata(file_with_path)
+            self.cache.put(file_with_path, stat.st_size, stat.st_mtime_ns, meta)
+            return meta
         except FileNotFoundError:
             self.meta_info.text_queue.put(f"File {f_name} could not be found.\n")
-            return None, None, None
-
-    def get_exif_value(self, exif_dict: dict[str, Any], dict1: str, key: int):
-        """Get the value for the given exif dict/key combo."""
-        if key in exif_dict[dict1]:
-            val = str(exif_dict[dict1][key], "ascii").strip().strip("\x00")
-            if len(val) > 0:
-                return val
-        return None
+            return None
+        except ValueError:
+            # The file is not a valid jpeg (e.g. empty or renamed), InvalidImageDataError
+            self.meta_info.text_queue.put(f"Metadata not readable for file: {f_name}.\n")
+            return None
 
-    def get_img_date(self, source_dir: str, file: str, file_extension: str):
+    def get_img_artist(self, src_dir: str, f_name: str, meta: Union[ImageMetadata, None] = None):
+        """
+        Collect and return the image artist information.
+        If the metadata of the file was already parsed it is reused.
+        """
+        if meta is None and (meta := self.get_img_metadata(src_dir, f_name)) is None:
+            return None, None, None
+        # If present get the artist, make and model from metadata
+        return meta.artist, meta.make, meta.model
+
+    def get_img_date(
+        self,
+        source_dir: str,
+        file: str,
+        file_extension: str,
+        meta: Union[ImageMetadata, None] = None,
+    ):
         """
         Obtains the creation date of the image by either accessing the meta data,
         or using the filename to parse the correct date.
@@ -506,40 +1133,41 @@ class Sorter:
         date = None
 
         if self.in_signature == "Metadata, fallback: Filename":
-            if not (date := self.get_img_date_by_metadata(source_dir, file, file_extension)):
+            if not (date := self.get_img_date_by_metadata(source_dir, file, file_extension, meta)):
                 self.meta_info.text_queue.put(f"Invoking fallback (Filename) for file: {file}.\n")
                 date = self.get_img_date_by_filename(file, file_extension)
         elif self.in_signature == "Filename, fallback: Metadata":
             if not (date := self.get_img_date_by_filename(file, file_extension)):
                 self.meta_info.text_queue.put(f"Invoking fallback (Metadata) for file: {file}.\n")
-                date = self.get_img_date_by_metadata(source_dir, file, file_extension)
+                date = self.get_img_date_by_metadata(source_dir, file, file_extension, meta)
         elif self.in_signature == "Metadata only":
-            date = self.get_img_date_by_metadata(source_dir, file, file_extension)
+            date = self.get_img_date_by_metadata(source_dir, file, file_extension, meta)
         elif self.in_signature == "Filename only":
             date = self.get_img_date_by_filename(file, file_extension)
 
         return date
 
-    def get_img_date_by_metadata(self, source_dir: str, file: str, file_extension: str):
-        """Parse the image date from the exif metadata of the given file."""
+    def get_img_date_by_metadata(
+        self,
+        source_dir: str,
+        file: str,
+        file_extension: str,
+        meta: Union[ImageMetadata, None] = None,
+    ):
+        """
+        Parse the image date from the exif metadata of the given file.
+        If the metadata of the file was already parsed it is reused.
+        """
         # Check if the file has metadata that can be parsed
         if file_extension == ".jpg":
             try:
-                exif_dict = piexif.load(join(source_dir, file))
+                if meta is None and (meta := self.get_img_metadata(source_dir, file)) is None:
+                    return None
                 # https://www.ffsf.de/threads/exif-datetimeoriginal-oder-datetimedigitized.9913/
                 # TODO date time original does not match imgname and shown date in windows
-                if piexif.ExifIFD.DateTimeOriginal in exif_dict["Exif"]:
-                    time = exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal]
-                    val = str(time, "ascii")
-                    date = datetime.datetime.strptime(val, "%Y:%m:%d %H:%M:%S")
-                    # Check if millisecounds are present and parse them if so
-                    if piexif.ExifIFD.SubSecTimeOriginal in exif_dict["Exif"]:
-                        ms = exif_dict["Exif"][piexif.ExifIFD.SubSecTimeOriginal]
-                        val += "." + str(ms, "ascii")
-                        date = datetime.datetime.strptime(val, "%Y:%m:%d %H:%M:%S.%f")
-                    return date
-            except FileNotFoundError:
-                self.meta_info.text_queue.put(f"File {file} could not be found.\n")
+                if meta.date_original is not None:
+                    # If present the millisecounds are parsed as well
+                    return parse_exif_date(meta.date_original, meta.subsec_original)
             except KeyError:
                 self.meta_info.text_queue.put(f"Metadata not readable for file: {file}.\n")
             except ValueError:
@@ -552,36 +1180,22 @@ class Sorter:
 
     # https://www.w3schools.com/python/python_regex.asp#search
     def get_img_date_by_filename(self, file: str, file_extension: str):
-        """Parse the image date from the filename of the given file."""
-        regex_list = self.meta_info.get_signature_regex()
-        strptime_list = self.meta_info.get_signature_strptime()
-        assert len(regex_list) == len(strptime_list)
-
-        # Test the file name against all supported regex
-        # In case a valid regex was found use the strp-string to parse the date.
-        for regex, strptime in zip(regex_list, strptime_list):
-            # Get the match using the current regex
-            if search := re.search(regex, file):
-                match = search.group(1) + file_extension
-
-                if strptime == "" or not isinstance(match, str):
-                    return None
-
-                try:
-                    return datetime.datetime.strptime(match, strptime + file_extension)
-                except ValueError:
-                    self.meta_info.text_queue.put(
-                        f"Time data not readable for file: \
-                            {file}, {strptime}, {file_extension}.\n"
-                    )
-                    return None
-
-        # If this is reached no matching signature was found
-        self.meta_info.text_queue.put(
-            f"Unsupported! No matching name-signature found for file: {file}.\n"
-        )
+        """
+        Parse the image date from the filename of the given file.
+        All supported signatures are matched at once, see signatures.SIGNATURES.
+        """
+        if (fields := match_signature(file)) is None:
+            # If this is reached no matching signature was found
+            self.meta_info.text_queue.put(
+                f"Unsupported! No matching name-signature found for file: {file}.\n"
+            )
+            return None
 
-        return None
+        try:
+            return parse_fields(fields)
+        except ValueError:
+            self.meta_info.text_queue.put(f"Time data not readable for file: {file}.\n")
+            return None
 
     def get_new_foldername(
         self, e_title: str, e_start: datetime.datetime, e_end: datetime.datetime
@@ -660,39 +1274,102 @@ class Sorter:
         elif self.file_signature == sig[4]:
             filename = date.strftime("%a %b %d %H-%M-%S %Y")
         else:
-            number = (
-                len(
-                    [
-                        name
-                        for name in os.listdir(event_dir)
-                        if os.path.isfile(join(event_dir, name))
-                    ]
-                )
-                + 1
-            )
+            number = self.count_files(event_dir) + 1
             event_dir = re.sub(r"[/\\]no_artist", "", event_dir)
             folder_name = re.split(r"[/\\]", event_dir)[-1]
             filename = f"{folder_name}_{number:03d}"
 
         return filename
 
-    def modify_metadata_piexif(self, file_with_path: str, meta_fields: list[dict[str, Any]]):
+    def get_dir_names(self, directory: str) -> set[str]:
+        """
+        Returns the names of all entries of the given directory. The directory is only read
+        once, afterwards the names are updated in memory for each file the sorter adds to it.
+        """
+        directory = os.path.normpath(directory)
+        if directory not in self.dir_names:
+            names = set()
+            count = 0
+            # The planned folders are created when executing the plan, these are empty
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        names.add(self.name_key(entry.name))
+                        count += entry.is_file()
+            except FileNotFoundError:
+                pass
+            self.dir_names[directory] = names
+            self.dir_file_counts[directory] = count
+        return self.dir_names[directory]
+
+    def name_key(self, name: str) -> str:
+        """
+        Returns the name as it is stored in the registry of get_dir_names. On file systems
+        that ignore the case (Windows, macOS) e.g. X.JPG and X.jpg are the same file.
+        """
+        return name.casefold() if self.ignore_case else name
+
+    def count_files(self, directory: str) -> int:
+        """Returns the number of files in the given directory, see get_dir_names."""
+        self.get_dir_names(directory)
+        return self.dir_file_counts[os.path.normpath(directory)]
+
+    def get_meta_fields(
+        self,
+        title: Union[str, None],
+        artist: Union[str, None],
+        date: Union[datetime.datetime, None],
+    ) -> list[dict[str, Any]]:
+        """Returns the metadata fields that are written to the sorted files."""
+        return [
+            {"dict": "0th", "key": piexif.ImageIFD.ImageDescription, "value": title},
+            {"dict": "0th", "key": piexif.ImageIFD.Artist, "value": artist},
+            {"dict": "Exif", "key": piexif.ExifIFD.DateTimeOriginal, "value": date},
+        ]
+
+    def modify_metadata_piexif(
+        self,
+        file_with_path: str,
+        meta_fields: list[dict[str, Any]],
+        exif_dict: Union[dict[str, Any], None] = None,
+    ):
         """
         Use piexif to load the exif metadata from the image
         and store it in the copy by using insert.
+        If the exif dict of the image was already loaded it is used instead.
         This method prevents the image data from being decompressed and potentially altered.
         Documentation: https://github.com/hMatoba/Piexif
         Source: https://stackoverflow.com/questions/53543549/
         OBACHT: piexif is only sparsely maintained
+        """
+        if (exif_bytes := self.get_exif_bytes(file_with_path, meta_fields, exif_dict)) is None:
+            return
+
+        piexif.insert(exif_bytes, file_with_path)
+
+    def get_exif_bytes(
+        self,
+        file_with_path: str,
+        meta_fields: list[dict[str, Any]],
+        exif_dict: Union[dict[str, Any], None] = None,
+        load_from: Union[str, None] = None,
+    ) -> Union[bytes, None]:
+        """
+        Returns the exif metadata of the given file with the modifications applied.
+        If the exif dict of the image was not loaded yet, it is loaded from the file
+        or from load_from if given. Returns None if the metadata should not be modified.
 
         The function processes all objects in meta_fields and tries to
         assign the value to the given dict/key combo.
         """
-        try:
-            exif_dict = piexif.load(file_with_path)
-        except FileNotFoundError:
-            self.meta_info.text_queue.put(f"File {file_with_path} could not modify metadata.\n")
-            return
+        if exif_dict is None:
+            try:
+                exif_dict = load_exif_dict(load_from or file_with_path)
+            except (FileNotFoundError, ValueError):
+                self.meta_info.text_queue.put(
+                    f"File {file_with_path} could not modify metadata.\n"
+                )
+                return None
 
         for elem in meta_fields:
             d = elem["dict"]
@@ -728,25 +1405,27 @@ class Sorter:
             ):
                 exif_dict[d][k] = v
 
-        # Write back to the file
         try:
             exif_bytes = piexif.dump(exif_dict)
         except ValueError:
             # Not the best solution, but this is necessary in case the file
             # has a thumbnail bigger than 64kb
+            if not self.meta_info.dont_ask_again_thumb.get() and self.defer_conflicts > 0:
+                self.deferred_thumbs.append((file_with_path, meta_fields))
+                return None
             if not self.meta_info.dont_ask_again_thumb.get():
-                box = MessageBox(
-                    title="Error: Thumbnail size > 64kb!",
-                    msg=f"The thumbnail of file {file_with_path} is to large.",
-                    again=self.meta_info.dont_ask_again_thumb,
-                    b1="Delete thumbnail",
-                    b2="Do not modify metadata",
-                )
-                self.confirm_thumb = box.choice
+                with self.dialog_lock:
+                    self.confirm_thumb = self.ui.ask(
+                        title="Error: Thumbnail size > 64kb!",
+                        msg=f"The thumbnail of file {file_with_path} is to large.",
+                        again=self.meta_info.dont_ask_again_thumb,
+                        b1="Delete thumbnail",
+                        b2="Do not modify metadata",
+                    )
             if self.confirm_thumb:
                 del exif_dict["thumbnail"]
                 exif_bytes = piexif.dump(exif_dict)
             else:
-                return
+                return None
 
-        piexif.insert(exif_bytes, file_with_path)
+        return exif_bytes
@@ -30,6 +30,21 @@ TooltipDict = {
         \nIf enabled metadata information is overwriten in case it is already present.",
     "rbtn_copyfile": "If selected the images are copied.",
     "rbtn_movefile": "If selected the images are moved.",
+    "cb_link_select": "Select how the images are copied.\
+        \nIf source and target are on the same device, Reflink shares the content\
+        \nof the copies until they are modified (not supported by all file systems) and\
+        \nHardlink creates a second name for the same file. Images whose metadata\
+        \nis modified are never hardlinked. Otherwise the images are copied.",
+    "cb_cache": "Enable or disable the metadata cache.\
+        \nIf enabled the metadata of unchanged files is not read again in the next run.",
+    "sb_workers": "Number of threads used for analysing the files.\
+        \nThe files are still moved or copied in order, such that the names stay the same.",
+    "cb_defer": "Enable or disable the deferred conflict resolution.\
+        \nIf enabled files that match multiple events or artists are put aside\
+        \nand the selection dialogs for them are shown at the end of the run.",
+    "cb_dry_run": "Enable or disable the dry run.\
+        \nIf enabled no file is moved or copied, instead the planned operations\
+        \nare saved to sort_plan.jsonl, which can be executed with cli.py --execute-plan.",
     # Main application: last section
     "btn_run": "Start the sorting process, all files will be processed \
         \naccording to the selected rules and using the current database.",
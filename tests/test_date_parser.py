@@ -0,0 +1,68 @@
+import pathmagic  # noqa isort:skip
+
+import unittest
+from datetime import datetime
+
+from date_parser import parse_exif_date, parse_fields
+from signatures import match_signature
+
+
+class TestDateParser(unittest.TestCase):
+    def test_run(self):
+        # File names of all signatures, including invalid dates.
+        # The dates must be the same as parsed by strptime.
+        # Order: file name, date part of the name, strptime format of the date
+        names = [
+            ("2020-07-09_09-28-50.123.jpg", "2020-07-09_09-28-50.123", "%Y-%m-%d_%H-%M-%S.%f"),
+            ("2020-07-09_09-28-60.jpg", "2020-07-09_09-28-60", "%Y-%m-%d_%H-%M-%S"),
+            ("20200709_092850_edit.jpg", "20200709_092850", "%Y%m%d_%H%M%S"),
+            ("IMG_20200230_092850.jpg", "20200230_092850", "%Y%m%d_%H%M%S"),
+            ("Tue Jul 07 09-28-50 2020.jpg", "Tue Jul 07 09-28-50 2020", "%a %b %d %H-%M-%S %Y"),
+            ("mon DEC 07 09-28-50 2020.jpg", "mon DEC 07 09-28-50 2020", "%a %b %d %H-%M-%S %Y"),
+            ("Xyz Jul 07 09-28-50 2020.jpg", "Xyz Jul 07 09-28-50 2020", "%a %b %d %H-%M-%S %Y"),
+            ("07-July-08_001.jpg", "07-July-08_001", "%m-%B-%d_%f"),
+            ("02-June-08_001.jpg", "02-June-08_001", "%m-%B-%d_%f"),
+            ("13-June-08_001.jpg", "13-June-08_001", "%m-%B-%d_%f"),
+            ("2020_[07_01].jpg", "2020_[07_01]", "%Y_[%m_%d]"),
+            ("2020_[07_01-07_10].jpg", "2020_[07_01", "%Y_[%m_%d"),
+            ("IMG-20200709-WA0001.jpg", "20200709", "%Y%m%d"),
+        ]
+        for name, date, strptime in names:
+            fields = match_signature(name)
+            self.assertTrue(fields is not None, f"No signature found for: {name}")
+            try:
+                expected = datetime.strptime(date, strptime)
+            except ValueError:
+                self.assertRaises(ValueError, parse_fields, fields)
+                continue
+            self.assertTrue(parse_fields(fields) == expected, f"Wrong date for: {name}")
+
+        # Signatures without date and unsupported names
+        self.assertTrue(parse_fields(match_signature("IMG_0000.jpg")) is None)
+        self.assertTrue(match_signature("gibberish0.jpg") is None)
+
+        self.exif_test()
+
+    def exif_test(self):
+        """The exif dates must be the same as parsed by strptime."""
+        values = [
+            (b"2020:07:09 09:28:50", None),
+            (b"2020:07:09 09:28:50", b"123"),
+            (b"2020:07:09 09:28:50", b"1234567"),
+            (b"2020:07:09 09:28:50", b""),
+            (b"2020:7:9 9:28:50", b"5"),
+            (b"2020:02:30 09:28:50", None),
+            (b"2020:07:09 09:28:60", None),
+            (b"2020:07:09 09:28:50\x00", None),
+            (b"0000:00:00 00:00:00", None),
+        ]
+        for date, subsec in values:
+            try:
+                expected = datetime.strptime(str(date, "ascii"), "%Y:%m:%d %H:%M:%S")
+                if subsec is not None:
+                    val = f"{str(date, 'ascii')}.{str(subsec, 'ascii')}"
+                    expected = datetime.strptime(val, "%Y:%m:%d %H:%M:%S.%f")
+            except ValueError:
+                self.assertRaises(ValueError, parse_exif_date, date, subsec)
+                continue
+            self.assertTrue(parse_exif_date(date, subsec) == expected, f"Wrong date: {date}")
@@ -6,7 +6,8 @@ import unittest
 from os.path import isfile, join
 from typing import Union
 
-from database import Database
+from database import EVENT_E_DATE, EVENT_S_DATE, SCHEMA_VERSION, Database
+from interval_index import IntervalIndex
 
 
 class TestDB(unittest.TestCase):
@@ -45,6 +46,14 @@ class TestDB(unittest.TestCase):
             self.db.clean(table[0])
             self.db_empty_test(table[0])
 
+        # Indexes must be present after clean and after opening an old database file
+        self.index_test()
+        self.db.conn.execute("DROP INDEX idx_events_dates")
+        self.db.conn.execute("PRAGMA user_version = 0")
+        self.db.close()
+        self.db = Database()
+        self.index_test()
+
         ####################
         # Load from file 2 #
         ####################
@@ -149,6 +158,13 @@ class TestDB(unittest.TestCase):
         res = self.db.get_by_date("events", check_date)
         self.assertTrue(res[0][1] == "test_title")
 
+        # The in-memory index must return the same events as the database
+        index = IntervalIndex(self.db.get_all("events"), EVENT_S_DATE, EVENT_E_DATE)
+        check_dates = (start_date, start_date + datetime.timedelta(days=14), end_date)
+        for date in check_dates + (end_date + datetime.timedelta(days=1),):
+            self.assertTrue(index.get_by_date(date) == self.db.get_by_date("events", date))
+        self.interval_index_test()
+
         res = self.db.get_by_date("subevents", check_date)
         self.assertTrue(res[0][1] == event_id)
         self.assertTrue(res[0][2] == "test_day1")
@@ -207,6 +223,17 @@ class TestDB(unittest.TestCase):
         self.assertTrue(artist[2] == make)
         self.assertTrue(artist[3] == model)
 
+    def index_test(self):
+        version = self.db.conn.execute("PRAGMA user_version").fetchone()[0]
+        self.assertTrue(version == SCHEMA_VERSION)
+        indexes = [
+            r[0] for r in self.db.conn.execute("SELECT name FROM sqlite_master WHERE type='index'")
+        ]
+        for table in ("events", "subevents", "artists", "participants"):
+            self.assertTrue(f"idx_{table}_dates" in indexes, f"Index missing for {table}")
+        self.assertTrue("idx_artists_camera" in indexes)
+        self.assertTrue("idx_participants_event" in indexes)
+
     def db_not_empty_test(self, table: str, size: int):
         res = self.db.get_all(table)
         self.assertTrue(len(res) == size)
@@ -214,3 +241,20 @@ class TestDB(unittest.TestCase):
     def db_empty_test(self, table: str):
         res = self.db.get_all(table)
         self.assertTrue(len(res) == 0)
+
+    def interval_index_test(self):
+        """Searching many dates at once must return the same rows as single searches."""
+        start = datetime.datetime(2020, 1, 1)
+        # Overlapping and nested time frames, Order: id, start, end
+        rows = [
+            (1, start, start + datetime.timedelta(days=30)),
+            (2, start + datetime.timedelta(days=5), start + datetime.timedelta(days=6)),
+            (3, start + datetime.timedelta(days=5), start + datetime.timedelta(days=40)),
+            (4, start + datetime.timedelta(days=50), start + datetime.timedelta(days=50)),
+            (5, start - datetime.timedelta(days=10), start + datetime.timedelta(days=2)),
+        ]
+        index = IntervalIndex(rows, 1, 2)
+        dates = [start + datetime.timedelta(hours=h) for h in range(-300, 1300, 7)]
+        dates += [row[1] for row in rows] + [row[2] for row in rows]
+        self.assertTrue(index.get_by_dates(dates) == [index.get_by_date(d) for d in dates])
+        self.assertTrue(IntervalIndex([], 1, 2).get_by_dates(dates[:3]) == [[], [], []])
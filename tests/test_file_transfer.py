@@ -0,0 +1,118 @@
+import pathmagic  # noqa isort:skip
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from os.path import join
+from unittest import mock
+
+import file_transfer
+import piexif
+from testfile_creator import modify_metadata_piexif
+
+
+class TestFileTransfer(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src = join(tmp_dir, "video.mp4")
+            # Larger than one chunk, such that multiple calls are needed
+            data = os.urandom(3 * 1000 + 7)
+            with open(src, "wb") as f:
+                f.write(data)
+            os.utime(src, (1000000000, 1000000000))
+
+            self.copy_test(src, data, tmp_dir)
+            self.link_test(src, tmp_dir)
+
+            # The source of a move to another device is kept if the copy is incomplete
+            dst = join(tmp_dir, "moved.mp4")
+
+            def copy_nothing(src: str, dst: str, chunk_size: int):
+                open(dst, "wb").close()
+
+            with mock.patch("file_transfer.same_device", return_value=False):
+                with mock.patch("os.rename", side_effect=OSError):
+                    with mock.patch("file_transfer.copy_data", side_effect=copy_nothing):
+                        with self.assertRaises(OSError):
+                            file_transfer.move_file(src, dst)
+            self.assertTrue(self.read(src) == data)
+            self.assertFalse(os.path.exists(dst))
+
+            self.assertTrue(file_transfer.move_file(src, dst) == "rename")
+            self.assertFalse(os.path.exists(src))
+            self.assertTrue(self.read(dst) == data)
+
+            self.exif_test(tmp_dir)
+
+            # Unknown devices are handled as ssd
+            self.assertTrue(file_transfer.device_kind(tmp_dir) in file_transfer.DEVICE_LIMITS)
+            self.assertTrue(file_transfer.device_kind(join(tmp_dir, "missing")) == "ssd")
+
+    def exif_test(self, tmp_dir: str):
+        """Copying with new exif data must create the same file as piexif.insert."""
+        TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+        sample = join(tmp_dir, "sample.jpg")
+        shutil.copy2(join(join(TEST_DIR, "samples"), "sample.jpg"), sample)
+
+        for has_exif in (False, True):
+            if has_exif:
+                data = {"Make": True, "Model": True, "Artist": True, "Date": True}
+                modify_metadata_piexif(sample, data, datetime(2020, 7, 9, 9, 28, 50))
+            exif_dict = piexif.load(sample)
+            exif_dict["0th"][piexif.ImageIFD.Artist] = b"Artist"
+            exif_bytes = piexif.dump(exif_dict)
+
+            expected = join(tmp_dir, "expected.jpg")
+            shutil.copy2(sample, expected)
+            piexif.insert(exif_bytes, expected)
+
+            dst = join(tmp_dir, "copy.jpg")
+            file_transfer.copy_with_exif(sample, dst, exif_bytes, 1000)
+            self.assertTrue(self.read(dst) == self.read(expected))
+
+        # Nothing is written for files that are not a .jpg
+        with self.assertRaises(ValueError):
+            file_transfer.copy_with_exif(join(tmp_dir, "link.mp4"), dst, exif_bytes)
+        self.assertTrue(self.read(dst) == self.read(expected))
+
+    def copy_test(self, src: str, data: bytes, tmp_dir: str):
+        """All copy methods must create the same file, including the modification time."""
+        dst = join(tmp_dir, "copy.mp4")
+        methods = [file_transfer.copy_data(src, dst, 1000)]
+        self.assertTrue(self.read(dst) == data)
+
+        # Simulate systems without copy_file_range and without sendfile
+        with mock.patch("os.copy_file_range", side_effect=OSError, create=True):
+            methods.append(file_transfer.copy_data(src, dst, 1000))
+            self.assertTrue(self.read(dst) == data)
+            with mock.patch("os.sendfile", side_effect=OSError, create=True):
+                methods.append(file_transfer.copy_data(src, dst, 1000))
+                self.assertTrue(self.read(dst) == data)
+        self.assertTrue(methods[1:] == ["sendfile", "copyfileobj"], methods)
+
+        # Some file systems copy nothing instead of failing
+        with mock.patch("os.copy_file_range", return_value=0, create=True):
+            self.assertTrue(file_transfer.copy_data(src, dst, 1000) == "sendfile")
+            self.assertTrue(self.read(dst) == data)
+            with mock.patch("os.sendfile", return_value=0, create=True):
+                self.assertTrue(file_transfer.copy_data(src, dst, 1000) == "copyfileobj")
+                self.assertTrue(self.read(dst) == data)
+
+        file_transfer.copy(src, dst, 1000)
+        self.assertTrue(self.read(dst) == data)
+        self.assertTrue(os.stat(dst).st_mtime == os.stat(src).st_mtime)
+
+    def link_test(self, src: str, tmp_dir: str):
+        """Links fall back to a copy, existing files are replaced."""
+        dst = join(tmp_dir, "link.mp4")
+        self.assertTrue(file_transfer.copy_file(src, dst, "Hardlink") in ("hardlink", "copy"))
+        self.assertTrue(file_transfer.copy_file(src, dst, "Hardlink") in ("hardlink", "copy"))
+        self.assertTrue(file_transfer.copy_file(src, dst, "Reflink") in ("reflink", "copy"))
+        self.assertTrue(os.path.samefile(src, dst) is False)
+        self.assertTrue(sorted(os.listdir(tmp_dir)) == ["copy.mp4", "link.mp4", "video.mp4"])
+
+    def read(self, file: str) -> bytes:
+        with open(file, "rb") as f:
+            return f.read()
@@ -0,0 +1,61 @@
+import pathmagic  # noqa isort:skip
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from os.path import join
+
+from journal import Journal
+from plan import Operation
+
+
+class TestJournal(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = join(tmp_dir, "journal.jsonl")
+            meta = {"title": "Event", "artist": None, "date": datetime(2020, 7, 9, 9, 28, 50)}
+            operations = [
+                Operation("move", join(tmp_dir, "a.jpg"), join(tmp_dir, "b", "a.jpg"), meta),
+                Operation("move", join(tmp_dir, "c.mp4"), join(tmp_dir, "b", "c.mp4")),
+            ]
+
+            journal = Journal(path)
+            self.assertFalse(journal.open("src", "tgt"))
+            journal.plan(operations)
+            journal.done(operations[1])
+            journal.close()
+            # Simulate a line that was not written completely
+            with open(path, "a", encoding="utf-8") as f:
+                f.write('{"done": "')
+
+            # The interrupted run is resumed with the remaining operation
+            journal = Journal(path)
+            self.assertTrue(journal.open("src", "tgt"))
+            self.assertTrue(journal.completed == {operations[1].src})
+            self.assertTrue(len(journal.pending) == 1)
+            self.assertTrue(journal.pending[0].to_dict() == operations[0].to_dict())
+            journal.done(operations[0])
+            journal.close()
+
+            # The entries written after the torn line are found when resuming again
+            journal = Journal(path)
+            self.assertTrue(journal.open("src", "tgt"))
+            self.assertTrue(journal.completed == {operations[0].src, operations[1].src})
+            self.assertTrue(len(journal.pending) == 0)
+            journal.close()
+
+            # The journal of an interrupted run is not overwritten by a run of other directories
+            with self.assertRaises(FileExistsError):
+                Journal(path).open("src", "other")
+            journal = Journal(path)
+            self.assertTrue(journal.open("src", "tgt"))
+            journal.close(delete=True)
+            self.assertFalse(os.path.exists(path))
+
+            # A journal that is not valid is started again
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('["not a journal"]\n')
+            journal = Journal(path)
+            self.assertFalse(journal.open("src", "other"))
+            journal.close(delete=True)
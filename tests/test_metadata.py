@@ -0,0 +1,81 @@
+import pathmagic  # noqa isort:skip
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+from os.path import join
+
+import piexif
+from metadata import load_exif_dict, load_metadata
+from metadata_cache import MetadataCache
+from testfile_creator import modify_metadata_piexif
+
+
+class TestMetadata(unittest.TestCase):
+    def test_run(self):
+        TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+        SAMPLE = join(join(TEST_DIR, "samples"), "sample.jpg")
+        date = datetime(2020, 7, 9, 9, 28, 50, 123000)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # All combinations of present and missing exif information
+            for make in (True, False):
+                for artist in (True, False):
+                    for has_date in (True, False):
+                        file = join(tmp_dir, "sample.jpg")
+                        shutil.copy2(SAMPLE, file)
+                        data = {"Make": make, "Model": make, "Artist": artist, "Date": has_date}
+                        modify_metadata_piexif(file, data, date)
+
+                        self.compare_with_piexif(file)
+                        self.assertTrue(load_exif_dict(file) == piexif.load(file))
+
+            # A file without any exif data
+            self.assertIsNone(load_metadata(SAMPLE).make)
+            self.assertTrue(load_metadata(SAMPLE).exif_dict["0th"] == piexif.load(SAMPLE)["0th"])
+
+            self.cache_test(join(tmp_dir, "cache.db"), file)
+
+    def cache_test(self, cache_file: str, file: str):
+        """The cache must return the same values and remove old entries when it is full."""
+        meta = load_metadata(file)
+        cache = MetadataCache(cache_file, max_entries=1)
+        cache.put("a.jpg", 10, 1, meta)
+        cache.put("b.jpg", 10, 1, meta)
+
+        cached = cache.get("a.jpg", 10, 1)
+        self.assertTrue(cached is not None and cached.tags == meta.tags)
+        self.assertTrue(cached.exif_dict is None)
+        # Changed files are not returned
+        self.assertIsNone(cache.get("a.jpg", 10, 2))
+        self.assertIsNone(cache.get("a.jpg", 11, 1))
+        cache.close()
+
+        cache = MetadataCache(cache_file, max_entries=1)
+        count = cache.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        self.assertTrue(count == 1, f"Cache was not reduced: {count}")
+        cache.close()
+
+    def compare_with_piexif(self, file: str):
+        """The header reader must return the same values as piexif."""
+        exif_dict = piexif.load(file)
+        meta = load_metadata(file)
+
+        self.assertTrue(
+            meta.date_original == exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal)
+        )
+        self.assertTrue(
+            meta.subsec_original == exif_dict["Exif"].get(piexif.ExifIFD.SubSecTimeOriginal)
+        )
+        for value, key in (
+            (meta.artist, piexif.ImageIFD.Artist),
+            (meta.make, piexif.ImageIFD.Make),
+            (meta.model, piexif.ImageIFD.Model),
+        ):
+            expected = exif_dict["0th"].get(key, b"").decode("ascii").strip() or None
+            self.assertTrue(value == expected, f"Exif value mismatch: {value} : {expected}")
+
+        # The complete dict is still available for the metadata modification
+        self.assertTrue(meta.exif_dict == exif_dict)
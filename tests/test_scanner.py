@@ -0,0 +1,31 @@
+import pathmagic  # noqa isort:skip
+
+import os
+import tempfile
+import unittest
+from os.path import join
+
+from scanner import scan_tree_threaded
+
+
+class TestScanner(unittest.TestCase):
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.mkdir(join(tmp_dir, "sub"))
+            open(join(tmp_dir, "sub", "file.jpg"), "w").close()
+
+            results = list(scan_tree_threaded(tmp_dir, True, lambda d, e: None))
+            self.assertTrue(
+                [(d, len(e)) for d, e, _ in results] == [(tmp_dir, 0), (join(tmp_dir, "sub"), 1)]
+            )
+
+            # An error of the scan thread must not block the consumer
+            def on_dir(file_dir: str, entries: list[os.DirEntry]):
+                if entries:
+                    raise PermissionError(file_dir)
+
+            results = []
+            with self.assertRaises(PermissionError):
+                for result in scan_tree_threaded(tmp_dir, True, on_dir, maxsize=1):
+                    results.append(result)
+            self.assertTrue(len(results) == 1)
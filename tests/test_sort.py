@@ -7,16 +7,21 @@ import pathmagic  # noqa isort:skip
 import os
 import re
 import shutil
+import tempfile
+import threading
 import unittest
+from datetime import datetime
 from os.path import isfile, join
-from tkinter import Tk
 from typing import Any
+from unittest import mock
 
 import piexif
 from database import Database
+from journal import Journal
 from meta_information import MetaInformation
+from plan import PLAN_BATCH_SIZE, Operation, Plan
 from sort_file_states import file_rules
-from sorter import Sorter
+from sorter import ANALYSIS_WINDOW, FileInfo, Sorter
 from testfile_creator import create_all_test_files
 
 IMAGE_FOLDER = "test_images"
@@ -29,11 +34,13 @@ class TestSort(unittest.TestCase):
         IMAGE_DIR = join(TEST_DIR, IMAGE_FOLDER)
         RESULT_DIR = join(TEST_DIR, "result_images")
 
-        window = Tk()  # noqa: F841
-
-        # Set the meta_info data
-        meta_info = MetaInformation()
+        # Set the meta_info data, the sorter runs without GUI
+        meta_info = MetaInformation(headless=True)
         meta_info.set_dirs(IMAGE_DIR, RESULT_DIR, DB_DIR, DB_DIR)
+        # The metadata cache is not kept after the test
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        meta_info.cache_file.set(join(cache_dir.name, "metadata_cache.db"))
 
         # load database
         self.db = Database()
@@ -61,7 +68,9 @@ class TestSort(unittest.TestCase):
 
             # Run the sort process
             s = Sorter(meta_info)
-            s.run()
+            with mock.patch("sorter.PLAN_BATCH_SIZE", settings["plan_batch_size"]):
+                with mock.patch("sorter.ANALYSIS_WINDOW", settings["analysis_window"]):
+                    s.run()
 
             # while not meta_info.text_queue.empty():
             #     print(meta_info.text_queue.get(0))
@@ -73,6 +82,30 @@ class TestSort(unittest.TestCase):
             shutil.rmtree(RESULT_DIR)
             os.mkdir(RESULT_DIR)
 
+        ################
+        # Dry run test #
+        ################
+        # The dry run only saves the plan, executing it must give the same results
+        meta_info.finished = False
+        settings = self.create_settings_obj(meta_info)
+        settings["process_samename"] = 1
+        self.set_meta_info(meta_info, settings)
+        meta_info.dry_run.set(1)
+        meta_info.plan_file.set(join(TEST_DIR, "test_plan.jsonl"))
+
+        s = Sorter(meta_info)
+        s.run()
+        self.assertTrue(len(os.listdir(RESULT_DIR)) == 0, "Dry run did modify the target!")
+
+        meta_info.dry_run.set(0)
+        s = Sorter(meta_info)
+        s.run_plan(meta_info.plan_file.get())
+        self.run_checks(meta_info, settings, IMAGE_DIR)
+
+        os.remove(meta_info.plan_file.get())
+        shutil.rmtree(RESULT_DIR)
+        os.mkdir(RESULT_DIR)
+
         #############
         # Move test #
         #############
@@ -93,6 +126,173 @@ class TestSort(unittest.TestCase):
         shutil.rmtree(RESULT_DIR)
         os.mkdir(RESULT_DIR)
 
+    def test_invalid_jpg(self):
+        """A .jpg that is not a jpeg is sorted by its file name, without metadata."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_dir = join(tmp_dir, "src")
+            tgt_dir = join(tmp_dir, "tgt")
+            os.mkdir(src_dir)
+            os.mkdir(tgt_dir)
+
+            meta_info = MetaInformation(headless=True)
+            meta_info.set_dirs(src_dir, tgt_dir, "", "")
+            meta_info.use_cache.set(0)
+            for read_choice in meta_info.get_read_choices():
+                with open(join(src_dir, "2020-07-09_09-28-50.jpg"), "w") as f:
+                    f.write("not a jpeg")
+                meta_info.finished = False
+                meta_info.in_signature.set(read_choice)
+                meta_info.copy_files.set(0)
+
+                Sorter(meta_info).run()
+                self.assertTrue(meta_info.finished, f"Sorting did not finish: {read_choice}")
+                moved = [f for _, _, files in os.walk(tgt_dir) for f in files]
+                self.assertTrue(len(moved) == 1, f"File was not moved: {read_choice}")
+                shutil.rmtree(tgt_dir)
+                os.mkdir(tgt_dir)
+
+    def test_headless_artist(self):
+        """Without a user a different artist in the metadata keeps the event of the file."""
+        s = Sorter(MetaInformation(headless=True))
+        s.read_settings()
+        s.subevents_by_event = {}
+        date = datetime(2020, 7, 9, 9, 28, 50)
+        info = FileInfo("2020-07-09_09-28-50.jpg", "")
+        info.f_date = date
+        event = (1, "Event", date, date, "Artist", date)
+        with mock.patch.object(s, "get_img_artist", return_value=("Other", "Make", "Model")):
+            with mock.patch.object(s, "get_event_by_artist", return_value=event):
+                info = s.analyze_file(info.f_name_cpl_old, "", info)
+        self.assertTrue(info.e_title == "Event" and info.a_name == "Artist")
+
+    def test_ignore_case(self):
+        """On file systems that ignore the case, existing files with other case are taken."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            s = Sorter(MetaInformation(headless=True))
+            s.read_settings()
+            s.ignore_case = True
+            date = datetime(2020, 7, 9, 9, 28, 50)
+            name = s.get_new_filename(tmp_dir, date)
+            open(join(tmp_dir, f"{name}.JPG"), "w").close()
+
+            self.assertTrue(
+                s.get_file_name(tmp_dir, date, ".jpg") == (f"{name}_1", f"{name}_1.jpg")
+            )
+
+    def test_resume(self):
+        """An interrupted run completes its pending operations and skips the processed files."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            src_dir = join(tmp_dir, "src")
+            tgt_dir = join(tmp_dir, "tgt")
+            os.mkdir(src_dir)
+            os.makedirs(join(tgt_dir, "moved"))
+            names = [f"2020-07-09_09-28-5{i}.jpg" for i in range(3)]
+            for name in names:
+                with open(join(src_dir, name), "w") as f:
+                    f.write("not a jpeg")
+            # The pending operation was executed before the run was interrupted
+            pending = Operation("move", join(src_dir, names[0]), join(tgt_dir, "moved", names[0]))
+            os.rename(pending.src, pending.dst)
+            # The completed operation copied the file, therefore the source still exists
+            completed = Operation("copy", join(src_dir, names[1]), join(tgt_dir, "copy.jpg"))
+
+            journal_path = join(tmp_dir, "journal.jsonl")
+            journal = Journal(journal_path)
+            journal.open(src_dir, tgt_dir)
+            journal.plan([pending, completed])
+            journal.done(completed)
+            journal.close()
+
+            meta_info = MetaInformation(headless=True)
+            meta_info.set_dirs(src_dir, tgt_dir, "", "")
+            meta_info.use_cache.set(0)
+            meta_info.copy_files.set(0)
+            meta_info.journal_file.set(journal_path)
+            Sorter(meta_info).run()
+            self.assertTrue(meta_info.finished)
+
+            messages = "".join(meta_info.text_queue.queue)
+            self.assertTrue(f"File {pending.dst} was already moved." in messages)
+            self.assertTrue(isfile(pending.dst))
+            # The completed file is skipped, only the remaining file is sorted
+            self.assertTrue(os.listdir(src_dir) == [names[1]])
+            moved = [f for _, _, files in os.walk(tgt_dir) for f in files]
+            self.assertTrue(len(moved) == 2)
+            self.assertFalse(os.path.exists(journal_path))
+
+            # The journal of an interrupted run of other directories is kept
+            journal = Journal(journal_path)
+            journal.open(tgt_dir, src_dir)
+            journal.close()
+            with open(journal_path, "rb") as f:
+                content = f.read()
+            Sorter(meta_info).run()
+            self.assertTrue(meta_info.finished)
+            with open(journal_path, "rb") as f:
+                self.assertTrue(f.read() == content)
+
+    def test_two_plans(self):
+        """Plans of the same target must not overwrite the files of each other."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tgt_dir = join(tmp_dir, "tgt")
+            os.mkdir(tgt_dir)
+            meta_info = MetaInformation(headless=True)
+            meta_info.use_cache.set(0)
+            meta_info.copy_files.set(0)
+            meta_info.dry_run.set(1)
+            plan_files = []
+            for name in ("a", "b"):
+                src_dir = join(tmp_dir, name)
+                os.mkdir(src_dir)
+                with open(join(src_dir, "2020-07-09_09-28-50.jpg"), "w") as f:
+                    f.write(name)
+                plan_files.append(join(tmp_dir, f"{name}.jsonl"))
+                meta_info.set_dirs(src_dir, tgt_dir, "", "")
+                meta_info.plan_file.set(plan_files[-1])
+                Sorter(meta_info).run()
+
+            for plan_file in plan_files:
+                Sorter(meta_info).run_plan(plan_file)
+                self.assertTrue(meta_info.finished)
+            contents = []
+            for file_dir, _, files in os.walk(tgt_dir):
+                for file in files:
+                    with open(join(file_dir, file)) as f:
+                        contents.append(f.read())
+            self.assertTrue(sorted(contents) == ["a", "b"], contents)
+
+            # Executing a plan again does not duplicate the files
+            Sorter(meta_info).run_plan(plan_files[0])
+            self.assertTrue(len([f for _, _, files in os.walk(tgt_dir) for f in files]) == 2)
+
+    def test_failed_transfer(self):
+        """Failed transfers are shown by the thread that executes the plan."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            ui = mock.Mock()
+            s = Sorter(MetaInformation(headless=True), ui)
+            s.read_settings()
+            s.io_worker_count = 4
+            plan = Plan()
+            for name in ("a.mp4", "b.mp4"):
+                plan.add(Operation("move", join(tmp_dir, name), join(tmp_dir, "tgt", name)))
+
+            threads = []
+            ui.show_error.side_effect = lambda message: threads.append(threading.get_ident())
+            s.execute_plan(plan)
+            self.assertTrue(threads == [threading.get_ident()] * 2)
+
+    def test_device_lock(self):
+        """Devices without limit can use all I/O workers."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            s = Sorter(MetaInformation(headless=True))
+            s.io_worker_count = 32
+            for kind, limit in (("ssd", 32), ("hdd", 1)):
+                s.device_locks = {}
+                with mock.patch("sorter.device_kind", return_value=kind):
+                    lock = s.get_device_lock(tmp_dir)
+                acquired = [lock.acquire(blocking=False) for _ in range(33)]
+                self.assertTrue(acquired.count(True) == limit, kind)
+
     def get_settings_list(self, meta_info: MetaInformation):
         """
         Creates a list of setting objects that should be tested.
@@ -170,6 +370,55 @@ class TestSort(unittest.TestCase):
         obj["process_unmatched"] = 0
         settings.append(obj)
 
+        # Add aditional settings case without the metadata cache
+        obj = self.create_settings_obj(meta_info)
+        obj["use_cache"] = 0
+        settings.append(obj)
+
+        # Add aditional settings cases for the parallel analysis of the files,
+        # the results must not differ from the serial processing
+        obj = self.create_settings_obj(meta_info)
+        obj["worker_count"] = 4
+        obj["process_samename"] = 1
+        settings.append(obj)
+
+        obj = self.create_settings_obj(meta_info)
+        obj["worker_count"] = 4
+        obj["file_signature"] = "Foldername_Number"
+        settings.append(obj)
+
+        # Add aditional settings case for deferring the user decisions to the end of the run
+        obj = self.create_settings_obj(meta_info)
+        obj["defer_conflicts"] = 1
+        obj["process_samename"] = 1
+        settings.append(obj)
+
+        # Add aditional settings cases for copying the files as links
+        for link_mode in meta_info.get_link_modes()[1:]:
+            obj = self.create_settings_obj(meta_info)
+            obj["link_mode"] = link_mode
+            settings.append(obj)
+
+        # Add aditional settings case for transferring the files one after another
+        obj = self.create_settings_obj(meta_info)
+        obj["io_worker_count"] = 1
+        obj["process_samename"] = 1
+        settings.append(obj)
+
+        # Add aditional settings cases for executing the plan and analyzing the files
+        # in small batches
+        obj = self.create_settings_obj(meta_info)
+        obj["plan_batch_size"] = 4
+        obj["analysis_window"] = 3
+        obj["process_samename"] = 1
+        settings.append(obj)
+
+        obj = self.create_settings_obj(meta_info)
+        obj["worker_count"] = 4
+        obj["analysis_window"] = 3
+        obj["process_samename"] = 1
+        settings.append(obj)
+
         return settings
 
     def run_checks(self, meta_info: MetaInformation, settings: dict[str, Any], IMAGE_DIR: str):
@@ -202,6 +451,13 @@ class TestSort(unittest.TestCase):
         print(f"Process same name: {settings['process_samename']}")
         print(f"Modify metadata: {settings['modify_meta']}")
         print(f"Recursive: {settings['recursive']}")
+        print(f"Worker count: {settings['worker_count']}")
+        print(f"Use cache: {settings['use_cache']}")
+        print(f"Defer conflicts: {settings['defer_conflicts']}")
+        print(f"Link mode: {settings['link_mode']}")
+        print(f"I/O worker count: {settings['io_worker_count']}")
+        print(f"Plan batch size: {settings['plan_batch_size']}")
+        print(f"Analysis window: {settings['analysis_window']}")
         print("############################################")
 
         # Get a list of all files that will be processed
@@ -239,7 +495,6 @@ class TestSort(unittest.TestCase):
             found_case = False
             # Iterate all possible cases that are defined for this file
             for case in file_rule["cases"]:
-
                 # Use the first found case
                 if found_case:
                     continue
@@ -340,6 +595,11 @@ class TestSort(unittest.TestCase):
         meta_info.process_unmatched.set(settings["process_unmatched"])
         meta_info.require_artist.set(settings["require_artist"])
         meta_info.process_samename.set(settings["process_samename"])
+        meta_info.worker_count.set(settings["worker_count"])
+        meta_info.use_cache.set(settings["use_cache"])
+        meta_info.defer_conflicts.set(settings["defer_conflicts"])
+        meta_info.link_mode.set(settings["link_mode"])
+        meta_info.io_worker_count = settings["io_worker_count"]
         meta_info.dont_ask_again_fnum.set(settings["dont_ask_again_fnum"])
 
         meta_info.in_signature.set(settings["in_signature"])
@@ -358,6 +618,13 @@ class TestSort(unittest.TestCase):
             "process_unmatched": 1,
             "require_artist": 1,
             "process_samename": 0,
+            "worker_count": 1,
+            "use_cache": 1,
+            "defer_conflicts": 0,
+            "link_mode": meta_info.get_link_modes()[0],
+            "io_worker_count": 8,
+            "plan_batch_size": PLAN_BATCH_SIZE,
+            "analysis_window": ANALYSIS_WINDOW,
             "dont_ask_again_fnum": False,
             "in_signature": meta_info.get_read_choices()[0],
             "file_signature": meta_info.get_supported_file_signatures()[0],